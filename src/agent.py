@@ -1,111 +1,271 @@
-from constants import FLAG, NO_MINE, UNEXPLORED
+import random
+
+from board import create_board, find_cells
+from constants import FLAG, NO_MINE, PLAYING, UNEXPLORED
+from linear import LinearSolver
+from probability import ProbabilitySolver
+from stats import SolverStats
+
+# Sets of rules the agent can deduce with, see Agent.set_strategy
+STRATEGIES = ("rules", "linear")
+
+class SolverCancelled(Exception):
+    pass
 
 
 class Agent:
-    def __init__(self, minesweeper):
+    def __init__(self, minesweeper, max_guess_depth=8, max_guess_nodes=1000, guess=False, batch=False,
+                 strategy="rules"):
+        self.minesweeper = minesweeper
         self.flag = minesweeper.flag
         self.get_adjacent_cells = minesweeper.get_adjacent_cells
         self.board = minesweeper.board
         self.size_x, self.size_y = minesweeper.size_x, minesweeper.size_y
         self.n_mines = minesweeper.n_mines
+        self.backend = minesweeper.backend
         self.watched_list = []
-        self.watched_board = [[False for _ in range(self.size_y)] for _ in range(self.size_x)]
+        self.watched_board = create_board(self.size_x, self.size_y, False, self.backend)
         self.stuck = False
+        # Return all the cells that the naive and subset passes find safe at once instead of the first ones found
+        self.batch = batch
+        # Limits of the search by contradiction, deeper or larger searches give up without a conclusion
+        self.max_guess_depth = max_guess_depth
+        self.max_guess_nodes = max_guess_nodes
+        # Cells assigned by the pending guesses, as (x, y, was in frontier) tuples
+        self._trail = []
+        self._guess_nodes = 0
+        # Unexplored cells around each clue that has some, with the number of mines missing around the clue
+        self._clue_groups = {}
+        # Clues around each unexplored cell that is in the group of a clue
+        self._clues_per_cell = {}
+        # Clues whose neighborhood changed since the groups were last updated
+        self._dirty_clues = set()
+        # Clues whose group has to be compared with the groups sharing cells with it
+        self._subset_checks = set()
+        # Keys of the frontier components in which no cell to open was found
+        self._unsolved_components = set()
+        # Keys of the frontier systems from which the linear solver decided nothing
+        self._unsolved_systems = set()
+        # When nothing can be deduced, open the cell that is the least likely to be a mine instead of being stuck
+        self.guess = guess
+        # Optional function polled during the searches, which raises SolverCancelled when it returns True
+        self.should_cancel = None
+        self.probability_solver = ProbabilitySolver(self.board, self.get_adjacent_cells)
+        self.linear_solver = LinearSolver()
+        self.random = random.Random(minesweeper.seed)
+        # Frontier components found by the last search by contradiction, reused to guess
+        self._frontier_components = None
+        # Rules applied in order by get_cells_to_open, as (name, method) tuples, see set_strategy
+        self.set_strategy(strategy)
+        # SolverStats recording the rules, see enable_stats
+        self.stats = None
 
     def _is_clue(self, x, y):
         return 1 <= self.board[x][y] <= 8
 
-    def _get_number_of_mines_left(self, board):
-        return (
-            self.n_mines - sum(
-                1 if board[x][y] == FLAG else 0
-                for x in range(self.size_x)
-                for y in range(self.size_y)
-            )
-        )
+    def _get_number_of_mines_left(self):
+        return self.n_mines - self.minesweeper.n_flags
+
+    def _get_number_of_unexplored_left(self):
+        return self.size_x * self.size_y - self.minesweeper.n_revealed - self.minesweeper.n_flags
 
     def _get_unexplored_left(self, board):
-        return [
-            (x, y)
-            for x in range(self.size_x)
-            for y in range(self.size_y)
-            if board[x][y] == UNEXPLORED
-        ]
+        return find_cells(board, UNEXPLORED)
 
-    def _guess_and_check_for_contradiction(self, board, x, y):
+    def _guess_and_check_for_contradiction(self, cells, n_mines_left, n_unexplored, x, y, depth=0):
         """ Assume that there is a mine at (x, y) and check for a contradiction.
-            Returns True if there is one, False otherwise.
+            cells is the frontier component of (x, y), or the whole frontier, in which further guesses are made.
+            n_mines_left and n_unexplored are the number of mines and unexplored cells left on the board.
+            The consequences of the assumption are written in place on the board and the frontier, and undone with the
+            trail before returning.
+            Returns True if there is one, False otherwise or if the search exceeds its depth or node budget.
         """
 
         def _flag(_x, _y):
-            board[_x][_y] = FLAG
-            for _ax, _ay in self.get_adjacent_cells(_x, _y):
-                _add_watched(_ax, _ay)
+            nonlocal n_mines_left, n_unexplored
+            _assign(_x, _y, FLAG)
+            n_mines_left -= 1
+            n_unexplored -= 1
 
         def _no_mine(_x, _y):
-            board[_x][_y] = NO_MINE
+            nonlocal n_unexplored
+            _assign(_x, _y, NO_MINE)
+            n_unexplored -= 1
+
+        def _assign(_x, _y, value):
+            trail.append((_x, _y, (_x, _y) in frontier))
+            board[_x][_y] = value
+            frontier.discard((_x, _y))
             for _ax, _ay in self.get_adjacent_cells(_x, _y):
                 _add_watched(_ax, _ay)
 
         def _add_watched(_x, _y):
-            if not watched_board[_x][_y] and self._is_clue(_x, _y):
+            if (_x, _y) not in watched and self._is_clue(_x, _y):
                 watched_list.append((_x, _y))
-                watched_board[_x][_y] = True
+                watched.add((_x, _y))
 
-        # Copy the board
-        board = [[board[x][y] for y in range(self.size_y)] for x in range(self.size_x)]
-        watched_board = [[False for y in range(self.size_y)] for x in range(self.size_x)]
-        watched_list = []
+        self._guess_nodes += 1
+        if self.should_cancel is not None and self.should_cancel():
+            raise SolverCancelled
+        if depth > self.max_guess_depth or self._guess_nodes > self.max_guess_nodes:
+            return False
 
-        _flag(x, y)
-        while watched_list:
-            x, y = watched_list.pop()
-            watched_board[x][y] = False
-            mines = []
-            unexplored = []
-            for ax, ay in self.get_adjacent_cells(x, y):
-                if board[ax][ay] == FLAG:
-                    mines.append((ax, ay))
-                elif board[ax][ay] == UNEXPLORED:
-                    unexplored.append((ax, ay))
-            if len(mines) > board[x][y] or (not unexplored and len(mines) != board[x][y]):
-                return True
-            elif len(mines) == board[x][y] and len(unexplored) > 0:
-                for ux, uy in unexplored:
-                    _no_mine(ux, uy)
-            elif len(mines) + len(unexplored) == board[x][y]:
-                for ux, uy in unexplored:
-                    if board[ux][uy] == UNEXPLORED:
-                        _flag(ux, uy)
-                        if not self._get_number_of_mines_left(board):
-                            for x, y in self._get_unexplored_left(board):
-                                _no_mine(x, y)
-                        for ax, ay in self.get_adjacent_cells(ux, y):
-                            _add_watched(ax, ay)
-
-        unexplored = self._get_unexplored_left(board)
-        n_mines_left = self._get_number_of_mines_left(board)
-        if n_mines_left < 0 or (not unexplored and n_mines_left):
-            return True
-
-        if unexplored and not len(unexplored) == n_mines_left:
-            guesses_to_attempts = set()
-            for ux, uy in unexplored:
-                if any(self._is_clue(ax, ay) for ax, ay in self.get_adjacent_cells(ux, uy)):
-                    guesses_to_attempts.add((ux, uy))
-            if (
-                guesses_to_attempts
-                and all(self._guess_and_check_for_contradiction(board, x, y) for x, y in guesses_to_attempts)
-            ):
+        board, frontier, trail = self.board, self.minesweeper.frontier, self._trail
+        watched = set()
+        watched_list = []
+        mark = len(trail)
+        try:
+            _flag(x, y)
+            while watched_list:
+                x, y = watched_list.pop()
+                watched.discard((x, y))
+                mines = []
+                unexplored = []
+                for ax, ay in self.get_adjacent_cells(x, y):
+                    if board[ax][ay] == FLAG:
+                        mines.append((ax, ay))
+                    elif board[ax][ay] == UNEXPLORED:
+                        unexplored.append((ax, ay))
+                if len(mines) > board[x][y] or (not unexplored and len(mines) != board[x][y]):
+                    return True
+                elif len(mines) == board[x][y] and len(unexplored) > 0:
+                    for ux, uy in unexplored:
+                        _no_mine(ux, uy)
+                elif len(mines) + len(unexplored) == board[x][y]:
+                    for ux, uy in unexplored:
+                        if board[ux][uy] == UNEXPLORED:
+                            _flag(ux, uy)
+                            if not n_mines_left:
+                                # Every unexplored cell is safe, only the ones next to a clue can contradict it
+                                for fx, fy in list(frontier):
+                                    _no_mine(fx, fy)
+                                n_unexplored = 0
+
+            if n_mines_left < 0 or (not n_unexplored and n_mines_left):
                 return True
 
-        return False
+            if n_unexplored and not n_unexplored == n_mines_left:
+                guesses_to_attempt = [cell for cell in cells if cell in frontier]
+                if (
+                    guesses_to_attempt
+                    and all(
+                        self._guess_and_check_for_contradiction(cells, n_mines_left, n_unexplored, x, y, depth + 1)
+                        for x, y in guesses_to_attempt
+                    )
+                ):
+                    return True
+
+            return False
+        finally:
+            # Undo the assignments made by this guess
+            while len(trail) > mark:
+                _x, _y, in_frontier = trail.pop()
+                board[_x][_y] = UNEXPLORED
+                if in_frontier:
+                    frontier.add((_x, _y))
+
+    def _get_frontier_components(self):
+        """ Partition the frontier in components of unexplored cells linked by the clues they share.
+            Returns a list of (clues, cells) tuples where clues is the list of clues adjacent to the frozenset of cells.
+        """
+        self._update_subset_index()
+        components = []
+        visited = set()
+        for cell in self._clues_per_cell:
+            if cell in visited:
+                continue
+            visited.add(cell)
+            clues = []
+            visited_clues = set()
+            cells = []
+            stack = [cell]
+            while stack:
+                cell = stack.pop()
+                cells.append(cell)
+                for clue in self._clues_per_cell[cell]:
+                    if clue not in visited_clues:
+                        visited_clues.add(clue)
+                        clues.append(clue)
+                        for adjacent_cell in self._clue_groups[clue][0]:
+                            if adjacent_cell not in visited:
+                                visited.add(adjacent_cell)
+                                stack.append(adjacent_cell)
+            components.append((clues, frozenset(cells)))
+        return components
+
+    def _update_subset_index(self):
+        """ Recompute the groups of unexplored cells of the clues whose neighborhood changed, and schedule the subset
+            check of these clues and of the clues sharing cells with them.
+        """
+        for cx, cy in self._dirty_clues:
+            old_group = self._clue_groups.pop((cx, cy), None)
+            if old_group is not None:
+                for cell in old_group[0]:
+                    clues = self._clues_per_cell[cell]
+                    clues.discard((cx, cy))
+                    if not clues:
+                        del self._clues_per_cell[cell]
 
-    def get_cells_to_open(self):
-        if self.stuck:
-            return []
+            adjacent_unexplored = []
+            n_mines_left = int(self.board[cx][cy])
+            for ax, ay in self.get_adjacent_cells(cx, cy):
+                if self.board[ax][ay] == UNEXPLORED:
+                    adjacent_unexplored.append((ax, ay))
+                elif self.board[ax][ay] == FLAG:
+                    n_mines_left -= 1
+            if adjacent_unexplored:
+                group = frozenset(adjacent_unexplored)
+                self._clue_groups[(cx, cy)] = group, n_mines_left
+                for cell in group:
+                    clues = self._clues_per_cell.setdefault(cell, set())
+                    self._subset_checks.update(clues)
+                    clues.add((cx, cy))
+                self._subset_checks.add((cx, cy))
+        self._dirty_clues.clear()
+
+    def _check_subsets(self):
+        """ Find the cells to open by comparing the groups of unexplored cells around the clues.
+            If the group of a clue contains the group of another clue missing as many mines, the cells that are only
+            in the larger group are safe. Only the clues scheduled by _update_subset_index are checked.
+        """
+        cells_to_open = set()
+        while self._subset_checks:
+            clue = self._subset_checks.pop()
+            if clue not in self._clue_groups:
+                continue
+            group, n_mines_left = self._clue_groups[clue]
+            for cell in group:
+                for other_clue in self._clues_per_cell[cell]:
+                    other_group, other_n_mines_left = self._clue_groups[other_clue]
+                    if other_n_mines_left == n_mines_left and other_group < group:
+                        if not self.batch:
+                            return list(group - other_group)
+                        cells_to_open.update(group - other_group)
+        return list(cells_to_open)
+
+    def _check_contradictions(self, clues, cells):
+        """ Find a cell to open among cells by assuming that there is a mine next to a clue missing a single one, and
+            checking whether it leads to a contradiction.
+        """
+        attempted_guesses = set()
+        for clue in clues:
+            adjacent_unexplored, n_mines_left = self._clue_groups[clue]
+            if n_mines_left == 1:
+                for ax, ay in filter(lambda _cell: _cell not in attempted_guesses, adjacent_unexplored):
+                    self._guess_nodes = 0
+                    if self._guess_and_check_for_contradiction(
+                        cells, self._get_number_of_mines_left(), self._get_number_of_unexplored_left(), ax, ay
+                    ):
+                        return [(ax, ay)]
+                    attempted_guesses.add((ax, ay))
+        return []
 
-        # Naive algorithm
+    def _check_watched(self):
+        """ Naive pass over the clues whose neighborhood changed: a clue with all its mines flagged makes its other
+            unexplored cells safe, and a clue with as many unexplored cells as mines missing makes them all mines.
+            In batch mode, the safe cells are collected instead of returned and no longer count as unexplored.
+        """
+        safe_cells = set()
         while self.watched_list:
             x, y = self.watched_list.pop()
             self.watched_board[x][y] = False
@@ -114,88 +274,194 @@ class Agent:
             for ax, ay in self.get_adjacent_cells(x, y):
                 if self.board[ax][ay] == FLAG:
                     mines.append((ax, ay))
-                elif self.board[ax][ay] == UNEXPLORED:
+                elif self.board[ax][ay] == UNEXPLORED and (ax, ay) not in safe_cells:
                     unexplored.append((ax, ay))
             if len(mines) == self.board[x][y] and len(unexplored) > 0:
-                return unexplored
+                if not self.batch:
+                    return unexplored
+                safe_cells.update(unexplored)
             elif len(mines) + len(unexplored) == self.board[x][y]:
                 for ux, uy in unexplored:
                     self.flag(ux, uy)
+        return list(safe_cells)
+
+    def _check_subset_groups(self):
+        self._update_subset_index()
+        return self._check_subsets()
+
+    def _check_components(self):
+        """ Guess and deduce by contradiction in each component of the frontier. """
+        # Split the frontier in components that share no clue
+        self._frontier_components = components = self._get_frontier_components()
+        frontier = self.minesweeper.frontier
+        n_mines_left = self._get_number_of_mines_left()
+        n_unexplored = self._get_number_of_unexplored_left()
+        if n_mines_left <= len(frontier) or n_unexplored - n_mines_left <= len(frontier):
+            # Few mines or few safe cells are left, so the mine count links the components and the search by
+            # contradiction has to guess over the whole frontier
+            self._unsolved_components = set()
+            components = [(clues, frontier, None) for clues, _ in components]
+        else:
+            # The components can be solved independently, skip the ones that didn't change since no cell to open was
+            # found in them
+            self._unsolved_components &= set(cells for _, cells in components)
+            components = [
+                (clues, cells, cells) for clues, cells in components if cells not in self._unsolved_components
+            ]
+
+        for clues, cells, key in components:
+            cells_to_open = self._check_contradictions(clues, cells)
+            if cells_to_open:
+                return cells_to_open
+            if key is not None:
+                self._unsolved_components.add(key)
+        return []
 
-        # Naive algorithm is stuck, we have to move to more advanced resolution
-        unexplored = self._get_unexplored_left(self.board)
-
-        # Find the clue cells adjacent to those unexplored cells
-        clues_to_check = set()
-        for x, y in unexplored:
-            clues_to_check.update(filter(lambda pos: self._is_clue(pos[0], pos[1]), self.get_adjacent_cells(x, y)))
-
-        # This dictionary where the key is the unexplored cell coordinate and the value is another dictionary where the
-        # key is a group of cells and the value is the number of mines that are contained in this group of cells
-        groups_per_cell = {}
-
-        # This dictionary contains the unexplored cells adjacent to each clue to check
-        adjacent_unexplored_per_cell = {}
-
-        # This dictionary contains the number of known mines adjacent to each clue to check
-        n_adjacent_mines_per_cell = {}
-
-        for cx, cy in clues_to_check:
-            adjacent_unexplored = []
-            n_adjacent_mines = 0
-            for ax, ay in self.get_adjacent_cells(cx, cy):
-                if self.board[ax][ay] == UNEXPLORED:
-                    adjacent_unexplored.append((ax, ay))
-                elif self.board[ax][ay] == FLAG:
-                    n_adjacent_mines += 1
-
-            adjacent_unexplored_per_cell[(cx, cy)] = adjacent_unexplored
-            n_adjacent_mines_per_cell[(cx, cy)] = n_adjacent_mines
-
-            adjacent_unexplored = tuple(sorted(adjacent_unexplored))
-            for cell in adjacent_unexplored:
-                groups_per_cell.setdefault(cell, {})[adjacent_unexplored] = self.board[cx][cy] - n_adjacent_mines
-
-        # Now use these information to find out which cells can be explored
-        for cx, cy in clues_to_check:
-            adjacent_unexplored = adjacent_unexplored_per_cell[(cx, cy)]
-            mines_left = self.board[cx][cy] - n_adjacent_mines_per_cell[(cx, cy)]
-
-            candidate_groups_dict = {}
-            for ux, uy in adjacent_unexplored:
-                for group, n_mines in groups_per_cell[(ux, uy)].items():
-                    if all((cx, cy) in adjacent_unexplored for cx, cy in group):
-                        candidate_groups_dict[group] = n_mines
-
-            for group, n_mines in candidate_groups_dict.items():
-                cells_left = set(adjacent_unexplored) - set(group)
-                if cells_left and mines_left == n_mines:
-                    return list(cells_left)
-
-        # If we still don't have a solution, try to guess and deduce by contradiction
-        attempted_guesses = set()
-        for cx, cy in clues_to_check:
-            adjacent_unexplored = adjacent_unexplored_per_cell[(cx, cy)]
-            n_mines_left = self.board[cx][cy] - n_adjacent_mines_per_cell[(cx, cy)]
-            if n_mines_left == 1:
-                for ax, ay in filter(lambda _cell: _cell not in attempted_guesses, adjacent_unexplored):
-                    if self._guess_and_check_for_contradiction(self.board, ax, ay):
-                        return [(ax, ay)]
-                    attempted_guesses.add((ax, ay))
-
+    def _check_linear(self):
+        """ Deduce the safe cells and the mines of each component of the frontier with the linear solver, again after
+            the mines it finds are flagged until it finds cells to open or decides nothing.
+        """
+        while True:
+            cells_to_open, n_flags = self._solve_linear_systems()
+            if cells_to_open or not n_flags:
+                return cells_to_open
+            # The flags completed the mines of their clues, which the naive pass opens around
+            cells_to_open = self._check_watched()
+            if cells_to_open:
+                return cells_to_open
+
+    def _solve_linear_systems(self):
+        """ Returns the safe cells of the first system of the frontier in which the linear solver decided some, and the
+            number of mines it flagged.
+        """
+        self._frontier_components = components = self._get_frontier_components()
+        frontier = self.minesweeper.frontier
+        n_mines_left = self._get_number_of_mines_left()
+        n_unexplored = self._get_number_of_unexplored_left()
+        if (
+            (n_mines_left <= len(frontier) or n_unexplored - n_mines_left <= len(frontier))
+            and len(frontier) <= self.linear_solver.max_variables
+        ):
+            # The mine count links the components, solve the whole frontier at once with the number of mines it can hold
+            self._unsolved_systems = set()
+            n_outside = n_unexplored - len(frontier)
+            mines_range = max(0, n_mines_left - n_outside), n_mines_left
+            systems = [([clue for clues, _ in components for clue in clues], None)]
+        else:
+            # Skip the components that didn't change since nothing was decided in them, a new clue can constrain a
+            # component without changing its cells
+            mines_range = None
+            systems = [(clues, (cells, frozenset(clues))) for clues, cells in components]
+            self._unsolved_systems &= set(key for _, key in systems)
+            systems = [(clues, key) for clues, key in systems if key not in self._unsolved_systems]
+
+        for clues, key in systems:
+            safe_cells, mines = self.linear_solver.solve(
+                [self._clue_groups[clue] for clue in clues], mines_range, self.should_cancel
+            )
+            if self.should_cancel is not None and self.should_cancel():
+                raise SolverCancelled
+            for x, y in mines:
+                self.flag(x, y)
+            if safe_cells or mines:
+                return safe_cells, len(mines)
+            if key is not None:
+                self._unsolved_systems.add(key)
+        return [], 0
+
+    def _check_mine_count(self):
+        """ Endgame rules on the number of mines left. """
         # If there are no more mines, the remaining cells should be opened
-        if not self._get_number_of_mines_left(self.board):
-            return unexplored
+        if not self._get_number_of_mines_left():
+            return self._get_unexplored_left(self.board)
 
-        if len(unexplored) == self._get_number_of_mines_left(self.board):
-            for x, y in unexplored:
+        if self._get_number_of_unexplored_left() == self._get_number_of_mines_left():
+            for x, y in self._get_unexplored_left(self.board):
                 self.flag(x, y)
+        return []
+
+    def _guess_safest_cell(self):
+        if self.guess and self.minesweeper.status == PLAYING:
+            return [self.get_safest_cell(self._frontier_components)]
+        return []
 
+    def get_cells_to_open(self):
+        """ Apply the rules in order until one of them finds cells to open. """
+        if self.stuck:
+            return []
+        for _, rule in self.rules:
+            cells_to_open = rule()
+            if cells_to_open:
+                return cells_to_open
         self.stuck = True
         return []
 
+    def set_strategy(self, strategy):
+        """ Select the rules applied by get_cells_to_open after the naive pass.
+            "rules" compares the groups of the clues and searches for contradictions in the frontier components, and
+            "linear" decides the frontier with the Gaussian elimination and the search of the LinearSolver.
+            Other strategies can be plugged by assigning a list of (name, method) tuples to rules, where each method
+            returns the cells to open and may flag mines. Must be called before enable_stats.
+        """
+        if strategy == "rules":
+            deductions = [("subsets", self._check_subset_groups), ("contradictions", self._check_components)]
+        elif strategy == "linear":
+            deductions = [("linear", self._check_linear)]
+        else:
+            raise ValueError(f"Unknown strategy {strategy!r}, expected one of {', '.join(STRATEGIES)}.")
+        self.strategy = strategy
+        self.rules = [
+            ("watched", self._check_watched),
+            *deductions,
+            ("mine_count", self._check_mine_count),
+            ("guess", self._guess_safest_cell),
+        ]
+
+    def enable_stats(self, profile=False):
+        """ Record the time spent and the cells found by each rule, and the size of the searches by contradiction.
+            The rules and the search are wrapped, so that the agent runs without any overhead when stats are disabled.
+            If profile is True, the calls to get_cells_to_open are also profiled with cProfile.
+            Returns the SolverStats recording them.
+        """
+        self.stats = SolverStats(self.minesweeper, profile)
+        self.rules = [(name, self.stats.wrap_rule(name, rule)) for name, rule in self.rules]
+        self._guess_and_check_for_contradiction = self.stats.wrap_search(self._guess_and_check_for_contradiction)
+        self.get_cells_to_open = self.stats.wrap_call(self.get_cells_to_open)
+        return self.stats
+
+    def get_safest_cell(self, components=None):
+        """ Returns the unexplored cell with the lowest probability of being a mine. """
+        if components is None:
+            components = self._get_frontier_components()
+        probabilities, outside_probability = self.probability_solver.get_probabilities(
+            components, self._get_number_of_mines_left(), self._get_number_of_unexplored_left()
+        )
+        cell = min(probabilities, key=probabilities.get, default=None)
+        if outside_probability is not None and (cell is None or outside_probability < probabilities[cell]):
+            cell = self._get_unexplored_outside_frontier()
+        return cell
+
+    def _get_unexplored_outside_frontier(self):
+        # Most of the board is usually unexplored when guessing outside of the frontier, try a few random cells first
+        for _ in range(64):
+            x, y = self.random.randrange(self.size_x), self.random.randrange(self.size_y)
+            if self.board[x][y] == UNEXPLORED and (x, y) not in self.minesweeper.frontier:
+                return x, y
+        return next(cell for cell in self._get_unexplored_left(self.board) if cell not in self.minesweeper.frontier)
+
     def add_watched(self, x, y):
-        if not self.watched_board[x][y] and self._is_clue(x, y):
-            self.watched_list.append((x, y))
-            self.watched_board[x][y] = True
-            self.stuck = False
+        if self._is_clue(x, y):
+            self._dirty_clues.add((x, y))
+            if not self.watched_board[x][y]:
+                self.watched_list.append((x, y))
+                self.watched_board[x][y] = True
+                self.stuck = False
+
+    def add_watched_clues(self, clues):
+        """ add_watched for a batch of cells that are all clues. """
+        self._dirty_clues.update(clues)
+        for x, y in clues:
+            if not self.watched_board[x][y]:
+                self.watched_list.append((x, y))
+                self.watched_board[x][y] = True
+                self.stuck = False
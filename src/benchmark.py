@@ -0,0 +1,141 @@
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import resource
+import sys
+import time
+
+from agent import STRATEGIES
+from board import BACKENDS
+from constants import LOSE, PLAYING, WIN
+from minesweeper import Minesweeper
+from stats import merge
+
+
+def play_game(config):
+    """ Play a game with the agent, timing each call to get_cells_to_open. """
+    size_x, size_y, n_mines, backend, seed, guess, batch, with_stats, strategy = config
+    minesweeper = Minesweeper(size_x, size_y, n_mines, backend, seed)
+    minesweeper.agent.set_strategy(strategy)
+    minesweeper.agent.guess = guess
+    minesweeper.agent.batch = batch
+    stats = minesweeper.agent.enable_stats() if with_stats else None
+    call_times = []
+    start = time.perf_counter()
+    minesweeper.left_click_at(size_x // 2, size_y // 2)
+    while minesweeper.status == PLAYING:
+        call_start = time.perf_counter()
+        move = minesweeper.agent.get_cells_to_open()
+        call_times.append(time.perf_counter() - call_start)
+        if not move:
+            break
+        minesweeper.left_click_cells(move)
+    return {
+        "seed": seed,
+        "status": minesweeper.status,
+        "n_moves": len(minesweeper.moves),
+        "time": time.perf_counter() - start,
+        "call_times": call_times,
+        # Kilobytes on Linux
+        "peak_memory": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "stats": stats.as_dict() if stats is not None else None,
+    }
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    return sorted(values)[max(0, math.ceil(p * len(values)) - 1)]
+
+
+def run(n_games, size_x, size_y, density, backend="list", seed=0, guess=False, batch=False, processes=None,
+        stats=False, strategy="rules"):
+    n_mines = min(max(1, round(density * size_x * size_y)), size_x * size_y - 1)
+    configs = [(size_x, size_y, n_mines, backend, seed + i, guess, batch, stats, strategy) for i in range(n_games)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        games = list(pool.imap_unordered(play_game, configs, chunksize=max(1, n_games // (8 * (processes or 1)))))
+    elapsed = time.perf_counter() - start
+
+    call_times = [call_time for game in games for call_time in game["call_times"]]
+    solve_time = sum(game["time"] for game in games)
+    n_moves = sum(game["n_moves"] for game in games)
+    results = {
+        "width": size_x,
+        "height": size_y,
+        "mines": n_mines,
+        "games": n_games,
+        "board": backend,
+        "seed": seed,
+        "guess": guess,
+        "batch": batch,
+        "strategy": strategy,
+        "win_rate": sum(game["status"] == WIN for game in games) / n_games,
+        "loss_rate": sum(game["status"] == LOSE for game in games) / n_games,
+        "stuck_rate": sum(game["status"] == PLAYING for game in games) / n_games,
+        "moves_per_second": n_moves / solve_time if solve_time else 0,
+        "call_time_p50": percentile(call_times, 0.5),
+        "call_time_p99": percentile(call_times, 0.99),
+        "peak_memory_kb": max(game["peak_memory"] for game in games),
+        "wall_time": elapsed,
+    }
+    if stats:
+        results["stats"] = merge(game["stats"] for game in games)
+    return results
+
+
+def flatten(results, prefix=""):
+    """ Flatten the nested dictionaries of the results into columns named after their keys joined by dots. """
+    columns = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            columns.update(flatten(value, f"{prefix}{key}."))
+        else:
+            columns[prefix + key] = value
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play seeded games with the agent without a window.")
+    parser.add_argument("games", type=int, help="number of games to play")
+    parser.add_argument("width", type=int, help="width of the grid")
+    parser.add_argument("height", type=int, help="height of the grid")
+    parser.add_argument(
+        "--density", type=float, nargs="+", default=[0.1],
+        help="proportion of cells containing a mine, the games are played for each density"
+    )
+    parser.add_argument("--board", choices=BACKENDS, default="list", help="storage used for the board cells")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, the next games use the next seeds")
+    parser.add_argument("--guess", action="store_true", help="open the safest cell when nothing can be deduced")
+    parser.add_argument("--batch", action="store_true", help="apply all the moves the solver finds at once")
+    parser.add_argument("--processes", type=int, help="number of worker processes, all the cores by default")
+    parser.add_argument("--format", choices=("json", "csv"), default="json", help="output format")
+    parser.add_argument("--stats", action="store_true", help="add the time spent and the cells found by each rule")
+    parser.add_argument(
+        "--strategy", choices=STRATEGIES, nargs="+", default=["rules"],
+        help="rules the solver deduces with, the games are played with each strategy to compare them"
+    )
+    args = parser.parse_args()
+
+    runs = [
+        run(
+            args.games, args.width, args.height, density, args.board, args.seed, args.guess, args.batch,
+            args.processes, args.stats, strategy
+        )
+        for density in args.density
+        for strategy in args.strategy
+    ]
+    if args.format == "json":
+        print(json.dumps(runs[0] if len(runs) == 1 else runs, indent=4))
+    else:
+        rows = [flatten(results) for results in runs]
+        # The stats of different strategies have columns for different rules
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(dict.fromkeys(key for row in rows for key in row)))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
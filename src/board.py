@@ -0,0 +1,226 @@
+import bisect
+
+from chunked import ChunkedBoard
+from constants import DIRECTIONS, FLAG, MINE, UNEXPLORED
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BACKENDS = ("list", "numpy", "chunked")
+
+
+def create_board(size_x, size_y, fill, backend="list"):
+    """ Create a size_x by size_y board indexed as board[x][y] and filled with the given value.
+        The "list" backend uses Python lists of lists, the "numpy" backend stores the cells in a contiguous uint8
+        array, which uses a byte per cell and allows whole-board queries to be vectorized. The "chunked" backend only
+        stores the chunks of cells that were written, see chunked.ChunkedBoard.
+    """
+    if backend == "numpy":
+        if np is None:
+            raise ImportError("The numpy board backend requires numpy to be installed.")
+        return np.full((size_x, size_y), fill, dtype=np.uint8)
+    elif backend == "list":
+        return [[fill for _ in range(size_y)] for _ in range(size_x)]
+    elif backend == "chunked":
+        return ChunkedBoard(size_x, size_y, fill)
+    raise ValueError(f"Unknown board backend {backend!r}, expected one of {', '.join(BACKENDS)}.")
+
+
+def count_cells(board, value):
+    if np is not None and isinstance(board, np.ndarray):
+        return int(np.count_nonzero(board == value))
+    return sum(column.count(value) for column in board)
+
+
+def find_cells(board, value):
+    if np is not None and isinstance(board, np.ndarray):
+        return list(zip(*(indices.tolist() for indices in np.nonzero(board == value))))
+    return [(x, y) for x, column in enumerate(board) for y, cell in enumerate(column) if cell == value]
+
+
+def sample_indices(population_size, k, excluded, rng, backend="list", keep_excluded=False):
+    """ Uniformly sample k distinct indices of range(population_size) that are not in the sorted list excluded,
+        without building the list of candidates. If keep_excluded is True, the excluded indices are added to the sample.
+    """
+    # The i-th excluded index has excluded[i] - i candidates before it, which maps a candidate rank to its index
+    shifted = [index - i for i, index in enumerate(excluded)]
+    n_candidates = population_size - len(excluded)
+    if backend == "numpy":
+        samples = np.random.default_rng(rng.getrandbits(64)).choice(n_candidates, k, replace=False)
+        samples += np.searchsorted(shifted, samples, side="right")
+        return np.concatenate((samples, excluded)).astype(np.int64) if keep_excluded else samples
+    samples = [sample + bisect.bisect_right(shifted, sample) for sample in rng.sample(range(n_candidates), k)]
+    return samples + excluded if keep_excluded else samples
+
+
+def create_mines_board(size_x, size_y, indices, mines=True, backend="list"):
+    """ Create the board holding MINE on mines and the number of adjacent mines on the other cells.
+        indices are the flat indices (x * size_y + y) of the mines, or of the cells without a mine if mines is False.
+    """
+    if backend == "numpy":
+        if mines:
+            mine_mask = np.zeros(size_x * size_y, dtype=bool)
+            mine_mask[indices] = True
+        else:
+            mine_mask = np.ones(size_x * size_y, dtype=bool)
+            mine_mask[indices] = False
+        mine_mask = mine_mask.reshape(size_x, size_y)
+        # Sum the 8 shifted copies of the padded mask, which is a 3x3 convolution without the center
+        padded = np.pad(mine_mask, 1).astype(np.uint8)
+        n_adjacent_mines = np.zeros((size_x, size_y), dtype=np.uint8)
+        for dx, dy in DIRECTIONS:
+            n_adjacent_mines += padded[1 + dx:1 + dx + size_x, 1 + dy:1 + dy + size_y]
+        n_adjacent_mines[mine_mask] = MINE
+        return n_adjacent_mines
+
+    cells = [divmod(index, size_y) for index in indices]
+    if mines:
+        mines_board = create_board(size_x, size_y, 0, backend)
+        for x, y in cells:
+            mines_board[x][y] = MINE
+        # Each mine adds one to its adjacent cells
+        for x, y in cells:
+            for dx, dy in DIRECTIONS:
+                ax, ay = x + dx, y + dy
+                if 0 <= ax < size_x and 0 <= ay < size_y and mines_board[ax][ay] != MINE:
+                    mines_board[ax][ay] += 1
+    else:
+        mines_board = create_board(size_x, size_y, MINE, backend)
+        for x, y in cells:
+            mines_board[x][y] = 0
+        # Each cell without a mine counts its adjacent mines
+        for x, y in cells:
+            for dx, dy in DIRECTIONS:
+                ax, ay = x + dx, y + dy
+                if 0 <= ax < size_x and 0 <= ay < size_y and mines_board[ax][ay] == MINE:
+                    mines_board[x][y] += 1
+    return mines_board
+
+
+def open_region(board, mines_board, x, y, backend="list"):
+    """ Reveal the unexplored cells connected to (x, y) through cells without adjacent mines, (x, y) must not have
+        adjacent mines. The region is explored breadth first, a whole layer of cells at a time with the numpy backend.
+        Returns the revealed cells, and the clues and unexplored cells around them as returned by find_cells_around.
+    """
+    board[x][y] = mines_board[x][y]
+    if backend == "numpy":
+        size_x, size_y = board.shape
+        dx, dy = np.array(DIRECTIONS).T
+        xs, ys = np.array([x]), np.array([y])
+        layers = [(xs, ys)]
+        while len(xs):
+            # Only the cells without adjacent mines open their neighbors
+            opening = board[xs, ys] == 0
+            xs = (xs[opening, None] + dx).ravel()
+            ys = (ys[opening, None] + dy).ravel()
+            inside = (xs >= 0) & (xs < size_x) & (ys >= 0) & (ys < size_y)
+            xs, ys = xs[inside], ys[inside]
+            unexplored = board[xs, ys] == UNEXPLORED
+            xs, ys = np.divmod(np.unique(xs[unexplored] * size_y + ys[unexplored]), size_y)
+            board[xs, ys] = mines_board[xs, ys]
+            layers.append((xs, ys))
+        xs = np.concatenate([xs for xs, _ in layers])
+        ys = np.concatenate([ys for _, ys in layers])
+        return (list(zip(xs.tolist(), ys.tolist())),) + _find_cells_around_numpy(board, xs, ys)
+
+    size_x, size_y = len(board), len(board[0])
+    cells = [(x, y)]
+    stack = [(x, y)]
+    border = []
+    clues = set()
+    while stack:
+        x, y = stack.pop()
+        for dx, dy in DIRECTIONS:
+            ax, ay = x + dx, y + dy
+            if 0 <= ax < size_x and 0 <= ay < size_y:
+                if board[ax][ay] == UNEXPLORED:
+                    board[ax][ay] = mines_board[ax][ay]
+                    cells.append((ax, ay))
+                    if board[ax][ay] == 0:
+                        stack.append((ax, ay))
+                    else:
+                        border.append((ax, ay))
+                elif 1 <= board[ax][ay] <= 8:
+                    clues.add((ax, ay))
+    # The other cells around the region are around the clues revealed on its border
+    clues_around, unexplored = find_cells_around(board, border, backend)
+    clues.update(clues_around)
+    return cells, list(clues), unexplored
+
+
+def open_all(board, mines_board, backend="list"):
+    """ Reveal every cell that isn't revealed yet, including the flags. With the chunked backend, only the cells of the
+        chunks that were written are revealed, so that the untouched part of the board stays unallocated.
+        Returns the revealed cells, and the clues and unexplored cells around them as returned by find_cells_around.
+    """
+    if backend == "numpy":
+        xs, ys = np.nonzero((board == UNEXPLORED) | (board == FLAG))
+        board[xs, ys] = mines_board[xs, ys]
+        return (list(zip(xs.tolist(), ys.tolist())),) + _find_cells_around_numpy(board, xs, ys)
+    if backend == "chunked":
+        cells = [(x, y) for x, y, cell in board.items() if cell in (UNEXPLORED, FLAG)]
+    else:
+        cells = [
+            (x, y) for x, column in enumerate(board) for y, cell in enumerate(column) if cell in (UNEXPLORED, FLAG)
+        ]
+    for x, y in cells:
+        board[x][y] = mines_board[x][y]
+    return (cells,) + find_cells_around(board, cells, backend)
+
+
+def find_cells_around(board, cells, backend="list"):
+    """ Returns the clues among the given cells and their adjacent cells, and the unexplored cells adjacent to a clue
+        of the given cells.
+    """
+    if backend == "numpy":
+        xs, ys = np.array(cells, dtype=np.int64).reshape(-1, 2).T
+        return _find_cells_around_numpy(board, xs, ys)
+
+    size_x, size_y = len(board), len(board[0])
+    clues = set()
+    unexplored = set()
+    for x, y in cells:
+        is_clue = 1 <= board[x][y] <= 8
+        if is_clue:
+            clues.add((x, y))
+        for dx, dy in DIRECTIONS:
+            ax, ay = x + dx, y + dy
+            if 0 <= ax < size_x and 0 <= ay < size_y:
+                if 1 <= board[ax][ay] <= 8:
+                    clues.add((ax, ay))
+                elif is_clue and board[ax][ay] == UNEXPLORED:
+                    unexplored.add((ax, ay))
+    return list(clues), list(unexplored)
+
+
+def _find_cells_around_numpy(board, xs, ys):
+    """ find_cells_around for the cells given as arrays of coordinates, the cells are dilated as a mask over their
+        bounding box.
+    """
+    if not len(xs):
+        return [], []
+    size_x, size_y = board.shape
+    x0, y0 = max(int(xs.min()) - 1, 0), max(int(ys.min()) - 1, 0)
+    x1, y1 = min(int(xs.max()) + 2, size_x), min(int(ys.max()) + 2, size_y)
+    values = board[x0:x1, y0:y1]
+    is_clue = (values >= 1) & (values <= 8)
+    mask = np.zeros(values.shape, dtype=bool)
+    mask[xs - x0, ys - y0] = True
+    clues_xs, clues_ys = np.nonzero(_dilate(mask) & is_clue)
+    unexplored_xs, unexplored_ys = np.nonzero(_dilate(mask & is_clue) & (values == UNEXPLORED))
+    return (
+        list(zip((clues_xs + x0).tolist(), (clues_ys + y0).tolist())),
+        list(zip((unexplored_xs + x0).tolist(), (unexplored_ys + y0).tolist())),
+    )
+
+
+def _dilate(mask):
+    """ Returns the mask of the cells of mask and of their adjacent cells. """
+    size_x, size_y = mask.shape
+    padded = np.pad(mask, 1)
+    dilated = mask.copy()
+    for dx, dy in DIRECTIONS:
+        dilated |= padded[1 + dx:1 + dx + size_x, 1 + dy:1 + dy + size_y]
+    return dilated
@@ -0,0 +1,274 @@
+import math
+import mmap
+import random
+import tempfile
+from collections import OrderedDict
+
+from constants import BOARD_CHUNK_SIZE, DIRECTIONS, MAX_LOADED_CHUNKS, MINE
+
+
+class _Column:
+    """ Column x of a chunked board, so that its cells can be accessed as board[x][y] like the other backends. """
+
+    __slots__ = ("board", "x")
+
+    def __init__(self, board, x):
+        self.board = board
+        self.x = x
+
+    def __len__(self):
+        return self.board.size_y
+
+    def __getitem__(self, y):
+        return self.board.get(self.x, y)
+
+    def __setitem__(self, y, value):
+        self.board.set(self.x, y, value)
+
+    def __iter__(self):
+        return (self.board.get(self.x, y) for y in range(self.board.size_y))
+
+    def count(self, value):
+        return sum(cell == value for cell in self)
+
+
+class _ChunkedGrid:
+    """ Grid of size_x by size_y cells split in square chunks of chunk_size cells, indexed as board[x][y].
+        The chunks in memory are kept in least recently used order.
+    """
+
+    def __init__(self, size_x, size_y, chunk_size, max_loaded_chunks):
+        self.size_x = size_x
+        self.size_y = size_y
+        self.chunk_size = chunk_size
+        self.max_loaded_chunks = max_loaded_chunks
+        self.chunks = OrderedDict()
+
+    def __len__(self):
+        return self.size_x
+
+    def __getitem__(self, x):
+        return _Column(self, x)
+
+    def __iter__(self):
+        return (_Column(self, x) for x in range(self.size_x))
+
+    def get(self, x, y):
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        return self.get_chunk((cx, cy))[lx * self.chunk_size + ly]
+
+    def get_chunk(self, key):
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.load_chunk(key)
+            self.chunks[key] = chunk
+            if len(self.chunks) > self.max_loaded_chunks:
+                self.evict_chunk(*self.chunks.popitem(last=False))
+        else:
+            self.chunks.move_to_end(key)
+        return chunk
+
+    def get_chunk_shape(self, key):
+        """ Returns the number of columns and rows of a chunk, which are smaller on the last chunks of the grid. """
+        cx, cy = key
+        return (
+            min(self.chunk_size, self.size_x - cx * self.chunk_size),
+            min(self.chunk_size, self.size_y - cy * self.chunk_size)
+        )
+
+    def load_chunk(self, key):
+        raise NotImplementedError
+
+    def evict_chunk(self, key, chunk):
+        pass
+
+
+class ChunkedBoard(_ChunkedGrid):
+    """ Board storing a byte per cell in chunks that are only created when one of their cells is written.
+        When too many chunks are in memory, the least recently used ones are moved to a memory-mapped temporary file
+        and loaded back when they are used again. Chunks that only hold the fill value are dropped instead, so the
+        memory used grows with the explored part of the board rather than with its area.
+    """
+
+    def __init__(self, size_x, size_y, fill, chunk_size=BOARD_CHUNK_SIZE, max_loaded_chunks=MAX_LOADED_CHUNKS):
+        super().__init__(size_x, size_y, chunk_size, max_loaded_chunks)
+        self.fill = int(fill)
+        # Slot in the store of the chunks that were evicted from memory
+        self.slots = {}
+        self.free_slots = []
+        self.n_slots = 0
+        self.store_file = None
+        self.store = None
+
+    def get(self, x, y):
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        if (cx, cy) not in self.chunks and (cx, cy) not in self.slots:
+            return self.fill
+        return self.get_chunk((cx, cy))[lx * self.chunk_size + ly]
+
+    def set(self, x, y, value):
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        self.get_chunk((cx, cy))[lx * self.chunk_size + ly] = value
+
+    def items(self):
+        """ Returns the (x, y, value) of the cells of the chunks created so far. """
+        cells = []
+        for cx, cy in list(self.chunks) + list(self.slots):
+            chunk = self.get_chunk((cx, cy))
+            width, height = self.get_chunk_shape((cx, cy))
+            x0, y0 = cx * self.chunk_size, cy * self.chunk_size
+            for lx in range(width):
+                for ly in range(height):
+                    cells.append((x0 + lx, y0 + ly, chunk[lx * self.chunk_size + ly]))
+        return cells
+
+    def load_chunk(self, key):
+        if key not in self.slots:
+            return bytearray([self.fill]) * self.chunk_size ** 2
+        slot = self.slots.pop(key)
+        self.free_slots.append(slot)
+        size = self.chunk_size ** 2
+        return bytearray(self.store[slot * size:(slot + 1) * size])
+
+    def evict_chunk(self, key, chunk):
+        if chunk.count(self.fill) == len(chunk):
+            return
+        if not self.free_slots:
+            self._grow_store()
+        slot = self.free_slots.pop()
+        self.store[slot * len(chunk):(slot + 1) * len(chunk)] = chunk
+        self.slots[key] = slot
+
+    def _grow_store(self):
+        """ Double the number of slots of the file storing the evicted chunks. """
+        n_slots = max(2 * self.n_slots, 64)
+        size = n_slots * self.chunk_size ** 2
+        if self.store_file is None:
+            self.store_file = tempfile.TemporaryFile()
+        else:
+            self.store.close()
+        self.store_file.truncate(size)
+        self.store = mmap.mmap(self.store_file.fileno(), size)
+        self.free_slots.extend(range(n_slots - 1, self.n_slots - 1, -1))
+        self.n_slots = n_slots
+
+
+class ChunkedMinesBoard(_ChunkedGrid):
+    """ Read-only board holding MINE on mines and the number of adjacent mines on the other cells, generated chunk by
+        chunk from a seed.
+        Each chunk gets a share of the mines in proportion to its number of cells, and the remaining mines are given one
+        by one to chunks picked at random. The mines of a chunk are sampled with a generator seeded by the seed and the
+        chunk coordinates, so that a chunk can be generated again after it was dropped from memory.
+    """
+
+    def __init__(self, size_x, size_y, n_mines, seed, safe_cells=(), chunk_size=BOARD_CHUNK_SIZE,
+                 max_loaded_chunks=MAX_LOADED_CHUNKS):
+        super().__init__(size_x, size_y, chunk_size, max_loaded_chunks)
+        self.n_mines = n_mines
+        self.seed = seed
+        self.n_chunks_x = math.ceil(size_x / chunk_size)
+        self.n_chunks_y = math.ceil(size_y / chunk_size)
+        # Local indices of the cells that can't hold a mine in each chunk
+        self.safe_indices = {}
+        for x, y in safe_cells:
+            (cx, lx), (cy, ly) = divmod(x, chunk_size), divmod(y, chunk_size)
+            self.safe_indices.setdefault((cx, cy), set()).add(lx * chunk_size + ly)
+
+        # The shares only depend on the number of cells of the chunks, which are full except on the last row and column
+        n_cells = size_x * size_y
+        n_shared = 0
+        for width, n_columns in self._get_sizes(size_x):
+            for height, n_rows in self._get_sizes(size_y):
+                n_shared += n_columns * n_rows * (n_mines * width * height // n_cells)
+        n_extra = n_mines - n_shared
+        # Shares of the chunks holding safe cells that were reduced to the number of cells that can hold a mine
+        self.capped = {}
+        for key, safe_indices in self.safe_indices.items():
+            width, height = self.get_chunk_shape(key)
+            n_free = width * height - len(safe_indices)
+            if self._get_share(key) > n_free:
+                n_extra += self._get_share(key) - n_free
+                self.capped[key] = n_free
+        # Chunks without a free cell left after their share can't get an extra mine
+        full = {
+            cx * self.n_chunks_y + cy
+            for cx, cy in self.safe_indices
+            if self.capped.get((cx, cy), self._get_share((cx, cy))) >= self._get_free_cells((cx, cy))
+        }
+        n_chunks = self.n_chunks_x * self.n_chunks_y
+        n_candidates = n_chunks - len(full)
+        if n_extra > n_candidates:
+            raise ValueError("Too many mines to spread them over the chunks of the board.")
+        # Pick the chunks with an extra mine by selection sampling, which doesn't need a list of the candidates
+        rng = random.Random(seed)
+        self.extra = bytearray(n_chunks)
+        for index in range(n_chunks):
+            if index in full:
+                continue
+            if rng.random() * n_candidates < n_extra:
+                self.extra[index] = 1
+                n_extra -= 1
+            n_candidates -= 1
+        self.mines = OrderedDict()
+
+    def _get_sizes(self, size):
+        """ Returns the distinct sizes of the chunks along an axis, and the number of chunks of each size. """
+        n_full, last = divmod(size, self.chunk_size)
+        return [(self.chunk_size, n_full)] + ([(last, 1)] if last else [])
+
+    def _get_share(self, key):
+        width, height = self.get_chunk_shape(key)
+        return self.n_mines * width * height // (self.size_x * self.size_y)
+
+    def _get_free_cells(self, key):
+        width, height = self.get_chunk_shape(key)
+        return width * height - len(self.safe_indices.get(key, ()))
+
+    def get_n_mines(self, key):
+        """ Returns the number of mines in a chunk. """
+        n_mines = self.capped.get(key, self._get_share(key))
+        return n_mines + self.extra[key[0] * self.n_chunks_y + key[1]]
+
+    def get_mines(self, key):
+        """ Returns the set of the local indices of the mines of a chunk. """
+        mines = self.mines.get(key)
+        if mines is None:
+            width, height = self.get_chunk_shape(key)
+            safe_indices = self.safe_indices.get(key, ())
+            candidates = [
+                lx * self.chunk_size + ly
+                for lx in range(width)
+                for ly in range(height)
+                if lx * self.chunk_size + ly not in safe_indices
+            ]
+            rng = random.Random(f"{self.seed}:{key[0]}:{key[1]}")
+            mines = frozenset(rng.sample(candidates, self.get_n_mines(key)))
+            self.mines[key] = mines
+            # Chunks need the mines of their neighbors, so keep more of them than of chunks
+            if len(self.mines) > 9 * self.max_loaded_chunks:
+                self.mines.popitem(last=False)
+        else:
+            self.mines.move_to_end(key)
+        return mines
+
+    def load_chunk(self, key):
+        cx, cy = key
+        width, height = self.get_chunk_shape(key)
+        chunk = bytearray(self.chunk_size ** 2)
+        # Each mine of the chunk and of its adjacent chunks adds one to its adjacent cells in the chunk
+        for ncx, ncy in [(cx, cy)] + [(cx + dx, cy + dy) for dx, dy in DIRECTIONS]:
+            if not (0 <= ncx < self.n_chunks_x and 0 <= ncy < self.n_chunks_y):
+                continue
+            for index in self.get_mines((ncx, ncy)):
+                mx, my = divmod(index, self.chunk_size)
+                mx += (ncx - cx) * self.chunk_size
+                my += (ncy - cy) * self.chunk_size
+                for dx, dy in DIRECTIONS:
+                    if 0 <= mx + dx < width and 0 <= my + dy < height:
+                        chunk[(mx + dx) * self.chunk_size + my + dy] += 1
+        for index in self.get_mines(key):
+            chunk[index] = MINE
+        return chunk
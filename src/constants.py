@@ -13,3 +13,30 @@ LEFT = 1
 RIGHT = 3
 MOUSEWHEEL_UP = 4
 MOUSEWHEEL_DOWN = 5
+
+# Frames per second of the game loop
+FPS = 60
+
+# Number of cells on each side of the chunks of the grid that are rendered and cached together
+CHUNK_SIZE = 64
+# Maximum size in pixels of the side of a chunk, zoomed in chunks have fewer cells
+MAX_CHUNK_PIXELS = 512
+# Maximum number of pixels of all the cached chunks
+MAX_CACHED_PIXELS = 2 ** 25
+# Number of zoom levels whose scaled sprites are kept
+MAX_CACHED_ZOOM_LEVELS = 3
+# Size in pixels of the cells under which the board is drawn with one color per cell instead of the sprites
+MIN_SPRITE_SIZE = 8
+# Color of each cell value in the overview of the board
+CELL_COLORS = [
+    (192, 192, 192), (0, 0, 255), (0, 128, 0), (255, 0, 0), (0, 0, 128),
+    (128, 0, 0), (0, 128, 128), (0, 0, 0), (128, 128, 128),
+    (96, 96, 96), (255, 128, 0), (0, 0, 0), (255, 0, 0), (192, 192, 192),
+]
+
+# Number of cells on each side of the chunks storing the cells of the chunked boards
+BOARD_CHUNK_SIZE = 64
+# Number of chunks of a chunked board kept in memory, the others are moved to a file
+MAX_LOADED_CHUNKS = 1024
+# Number of cells whose adjacent cells are kept by the game, the cache is cleared when it is full
+MAX_CACHED_ADJACENT_CELLS = 2 ** 17
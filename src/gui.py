@@ -1,8 +1,33 @@
 import math
 import os
+from collections import OrderedDict
 
 import pygame
 
+from constants import (
+    CELL_COLORS, CHUNK_SIZE, MAX_CACHED_PIXELS, MAX_CACHED_ZOOM_LEVELS, MAX_CHUNK_PIXELS, MIN_SPRITE_SIZE
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+RES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "res")
+# Image of each cell value, in the order of the values
+SPRITE_NAMES = [str(i) for i in range(9)] + ["unexplored", "flag", "mine", "mine_hit"]
+
+# Sprites loaded from the resources, shared by all the windows
+_atlas = []
+
+
+def load_atlas():
+    """ Load the sprite of each cell value the first time it is needed. """
+    if not _atlas:
+        _atlas.extend(pygame.image.load(os.path.join(RES_DIR, f"{name}.png")) for name in SPRITE_NAMES)
+    return _atlas
+
 
 class GUI:
     def __init__(self, minesweeper):
@@ -20,30 +45,19 @@ class GUI:
         self.zoom = 1
         self.zoom_max = max_size_case / self.size_case
         self.zoom_pos = self.res_x / 2, self.res_y / 2
-        self.sprites = []
-        for i in range(0, int(math.log2(max_size_case / self.size_case)) + 1):
-            s = []
-            for j in range(9):
-                sprite = pygame.image.load(f"../res/{j}.png")
-                sprite = pygame.transform.scale(sprite, (self.size_case * 2 ** i, self.size_case * 2 ** i))
-                s.append(sprite)
-            sprite = pygame.image.load("../res/unexplored.png")
-            sprite = pygame.transform.scale(sprite, (self.size_case * 2 ** i, self.size_case * 2 ** i))
-            s.append(sprite)
-            sprite = pygame.image.load("../res/flag.png")
-            sprite = pygame.transform.scale(sprite, (self.size_case * 2 ** i, self.size_case * 2 ** i))
-            s.append(sprite)
-            sprite = pygame.image.load("../res/mine.png")
-            sprite = pygame.transform.scale(sprite, (self.size_case * 2 ** i, self.size_case * 2 ** i))
-            s.append(sprite)
-            sprite = pygame.image.load("../res/mine_hit.png")
-            sprite = pygame.transform.scale(sprite, (self.size_case * 2 ** i, self.size_case * 2 ** i))
-            s.append(sprite)
-            self.sprites.append(s)
+        # Sprites scaled to the size of the cells of each zoom level, the least recently used first
+        self.sprites = OrderedDict()
+
+        # Board drawn with one pixel of the color of each cell, when the cells are too small for the sprites
+        self.overview = None
 
         self.display = pygame.display.set_mode((self.res_x, self.res_y))
         pygame.display.set_caption("Minesweeper")
 
+        # Rendered chunks of cells by (zoom level, chunk x, chunk y), the least recently used first
+        self.chunks = OrderedDict()
+        self.n_cached_pixels = 0
+
     def convert_to_global_coord(self, lx, ly):
         if self.zoom == 1:
             return lx, ly
@@ -91,31 +105,150 @@ class GUI:
             self.zoom_pos = gx2, gy2
             self.draw()
 
-    def update(self):
-        if self.zoom == 1:
-            for x, y in self.minesweeper.updated_cells:
-                self.display.blit(self.sprites[0][self.minesweeper.board[x][y]], (x * self.size_case, y * self.size_case))
+    def get_sprites(self, level):
+        """ Returns the sprites scaled for the given zoom level, scaling them the first time the level is used. """
+        if level in self.sprites:
+            self.sprites.move_to_end(level)
+            return self.sprites[level]
+
+        size_case = self.size_case * 2 ** level
+        sprites = [
+            pygame.transform.scale(sprite, (size_case, size_case)).convert_alpha() for sprite in load_atlas()
+        ]
+        self.sprites[level] = sprites
+        if len(self.sprites) > MAX_CACHED_ZOOM_LEVELS:
+            self.sprites.popitem(last=False)
+        return sprites
+
+    def get_chunk_size(self, level):
+        """ Returns the number of cells on each side of a chunk at the given zoom level. """
+        return max(1, min(CHUNK_SIZE, MAX_CHUNK_PIXELS // (self.size_case * 2 ** level)))
+
+    def get_chunk(self, level, cx, cy):
+        """ Returns the surface of a chunk, rendering it if it isn't cached. """
+        key = level, cx, cy
+        if key in self.chunks:
+            self.chunks.move_to_end(key)
+            return self.chunks[key]
+
+        chunk_size = self.get_chunk_size(level)
+        size_case = self.size_case * 2 ** level
+        sprites = self.get_sprites(level)
+        board = self.minesweeper.board
+        x0, y0 = cx * chunk_size, cy * chunk_size
+        x1, y1 = min(x0 + chunk_size, self.size_x), min(y0 + chunk_size, self.size_y)
+        chunk = pygame.Surface(((x1 - x0) * size_case, (y1 - y0) * size_case))
+        chunk.blits(
+            [
+                (sprites[board[x][y]], ((x - x0) * size_case, (y - y0) * size_case))
+                for x in range(x0, x1)
+                for y in range(y0, y1)
+            ],
+            doreturn=False
+        )
+
+        self.chunks[key] = chunk
+        self.n_cached_pixels += chunk.get_width() * chunk.get_height()
+        while self.n_cached_pixels > MAX_CACHED_PIXELS and len(self.chunks) > 1:
+            _, evicted_chunk = self.chunks.popitem(last=False)
+            self.n_cached_pixels -= evicted_chunk.get_width() * evicted_chunk.get_height()
+        return chunk
+
+    def get_visible_chunks(self, level):
+        """ Returns the coordinates of the chunks intersecting the window. """
+        chunk_size = self.get_chunk_size(level)
+        lb_x, lb_y = self.convert_to_game_coord(0, 0)
+        ub_x, ub_y = self.convert_to_game_coord(int(self.res_x - 1), int(self.res_y - 1))
+        ub_x, ub_y = min(ub_x, self.size_x - 1), min(ub_y, self.size_y - 1)
+        return [
+            (cx, cy)
+            for cx in range(lb_x // chunk_size, ub_x // chunk_size + 1)
+            for cy in range(lb_y // chunk_size, ub_y // chunk_size + 1)
+        ]
+
+    def blit_chunk(self, level, cx, cy):
+        """ Draw a chunk on the display and return the rectangle it covers. """
+        chunk_size = self.get_chunk_size(level)
+        lx, ly = self.convert_to_local_coord(cx * chunk_size, cy * chunk_size)
+        return self.display.blit(self.get_chunk(level, cx, cy), (math.floor(lx), math.floor(ly)))
+
+    def is_overview(self):
+        return self.size_case * self.zoom < MIN_SPRITE_SIZE
+
+    def build_overview(self):
+        board = self.minesweeper.board
+        if np is not None and isinstance(board, (list, np.ndarray)):
+            self.overview = pygame.Surface((self.size_x, self.size_y))
+            pygame.surfarray.blit_array(self.overview, np.array(CELL_COLORS, dtype=np.uint8)[np.asarray(board)])
         else:
-            sprites = self.sprites[int(math.log2(self.zoom))]
-            lb_x, lb_y = self.convert_to_game_coord(0, 0)
-            ub_x, ub_y = self.convert_to_game_coord(int(self.res_x - 1), int(self.res_y - 1))
-            for x, y in self.minesweeper.updated_cells:
-                if lb_x <= x <= ub_x and lb_y <= y <= ub_y:
-                    lx, ly = self.convert_to_local_coord(x, y)
-                    self.display.blit(sprites[self.minesweeper.board[x][y]], (lx, ly))
-        pygame.display.update()
+            colors = [bytes(color) for color in CELL_COLORS]
+            pixels = b"".join(colors[board[x][y]] for y in range(self.size_y) for x in range(self.size_x))
+            self.overview = pygame.image.frombuffer(pixels, (self.size_x, self.size_y), "RGB").copy()
+
+    def draw_overview(self):
+        """ Scale the visible part of the overview to the window. """
+        if self.overview is None:
+            self.build_overview()
+        size_case = self.size_case * self.zoom
+        gx0, gy0 = self.convert_to_global_coord(0, 0)
+        gx1, gy1 = self.convert_to_global_coord(self.res_x, self.res_y)
+        x0, y0 = max(0, math.floor(gx0 / self.size_case)), max(0, math.floor(gy0 / self.size_case))
+        x1 = min(self.size_x, math.ceil(gx1 / self.size_case))
+        y1 = min(self.size_y, math.ceil(gy1 / self.size_case))
+        view = self.overview.subsurface((x0, y0, x1 - x0, y1 - y0))
+        if size_case != 1:
+            view = pygame.transform.scale(view, (round((x1 - x0) * size_case), round((y1 - y0) * size_case)))
+        lx, ly = self.convert_to_local_coord(x0, y0)
+        self.display.blit(view, (math.floor(lx), math.floor(ly)))
+
+    def invalidate_chunks(self, cells, kept_level=None):
+        """ Drop the cached chunks containing the cells, except the ones of kept_level. """
+        for cached_level in set(key[0] for key in self.chunks) - {kept_level}:
+            chunk_size = self.get_chunk_size(cached_level)
+            for x, y in cells:
+                chunk = self.chunks.pop((cached_level, x // chunk_size, y // chunk_size), None)
+                if chunk is not None:
+                    self.n_cached_pixels -= chunk.get_width() * chunk.get_height()
+
+    def update(self):
+        """ Redraw the updated cells on the cached chunks and refresh only the visible chunks that changed. """
+        board = self.minesweeper.board
+        updated_cells = self.minesweeper.updated_cells
+        if self.overview is not None:
+            for x, y in updated_cells:
+                self.overview.set_at((x, y), CELL_COLORS[board[x][y]])
+        if self.is_overview():
+            self.invalidate_chunks(updated_cells)
+            if updated_cells:
+                self.draw_overview()
+                pygame.display.update()
+            return
+
+        level = int(math.log2(self.zoom))
+        sprites = self.get_sprites(level)
+        size_case = self.size_case * 2 ** level
+        chunk_size = self.get_chunk_size(level)
+        dirty_chunks = set()
+        for x, y in updated_cells:
+            cx, cy = x // chunk_size, y // chunk_size
+            dirty_chunks.add((cx, cy))
+            chunk = self.chunks.get((level, cx, cy))
+            if chunk is not None:
+                chunk.blit(sprites[board[x][y]], ((x - cx * chunk_size) * size_case, (y - cy * chunk_size) * size_case))
+        # The chunks of the other zoom levels are rendered again when they are needed
+        self.invalidate_chunks(updated_cells, level)
+
+        visible_chunks = set(self.get_visible_chunks(level))
+        rects = [self.blit_chunk(level, cx, cy) for cx, cy in dirty_chunks if (cx, cy) in visible_chunks]
+        if rects:
+            pygame.display.update(rects)
 
     def draw(self):
-        if self.zoom == 1:
-            for x in range(self.size_x):
-                for y in range(self.size_y):
-                    self.display.blit(self.sprites[0][self.minesweeper.board[x][y]], (x * self.size_case, y * self.size_case))
+        self.display.fill((0, 0, 0))
+        if self.is_overview():
+            self.draw_overview()
         else:
-            sprites = self.sprites[int(math.log2(self.zoom))]
-            lb_x, lb_y = self.convert_to_game_coord(0, 0)
-            ub_x, ub_y = self.convert_to_game_coord(self.res_x - 1, self.res_y - 1)
-            for x in range(lb_x, ub_x + 1):
-                for y in range(lb_y, ub_y + 1):
-                    lx, ly = self.convert_to_local_coord(x, y)
-                    self.display.blit(sprites[self.minesweeper.board[x][y]], (lx, ly))
+            level = int(math.log2(self.zoom))
+            for cx, cy in self.get_visible_chunks(level):
+                self.blit_chunk(level, cx, cy)
         pygame.display.update()
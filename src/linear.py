@@ -0,0 +1,183 @@
+import math
+
+
+class _NothingToDecide(Exception):
+    pass
+
+
+class LinearSolver:
+    """ Deduces the safe cells and the mines of the frontier from the equations of the clues.
+        Each clue says that the sum of its unexplored cells, 1 for a mine and 0 otherwise, is the number of mines it is
+        missing. The equations are reduced by Gaussian elimination, and a reduced equation whose right side is the
+        largest or the smallest value its left side can take decides all of its cells. When the elimination decides
+        nothing, the valid mine configurations are searched by backtracking with unit propagation over bitsets of the
+        cells, and the cells with the same value in all of them are decided. Searches over the budget decide nothing.
+    """
+
+    def __init__(self, max_variables=256, max_nodes=20000):
+        self.max_variables = max_variables
+        self.max_nodes = max_nodes
+
+    def solve(self, constraints, mines_range=None, should_cancel=None):
+        """ constraints is a list of (cells, n_mines) tuples, saying that n_mines of the cells are mines.
+            mines_range is the (minimum, maximum) number of mines among all the cells of the constraints, or None.
+            should_cancel is an optional function polled during the search, which stops it when it returns True.
+            Returns the list of the safe cells and the list of the mines.
+        """
+        variables = list(dict.fromkeys(cell for cells, _ in constraints for cell in cells))
+        indices = {cell: i for i, cell in enumerate(variables)}
+        masks = [(sum(1 << indices[cell] for cell in cells), n_mines) for cells, n_mines in constraints]
+        all_cells = (1 << len(variables)) - 1
+        small = len(variables) <= self.max_variables
+
+        equations = list(masks)
+        if small and mines_range is not None and mines_range[0] == mines_range[1]:
+            equations.append((all_cells, mines_range[0]))
+        safe, mines = self._eliminate(equations)
+        if not safe and not mines and small:
+            safe, mines = self._search(masks, len(variables), mines_range, should_cancel)
+        return [variables[i] for i in _bits(safe)], [variables[i] for i in _bits(mines)]
+
+    def _eliminate(self, equations):
+        """ Reduce the equations, given as (bitset of the cells, number of mines) tuples, to reduced row echelon form
+            with integer coefficients, and decide the cells of the reduced equations at one of their bounds.
+            Returns the bitsets of the safe cells and of the mines.
+        """
+        # Reduced equations as ({variable: coefficient}, right side) tuples, and the one of each pivot variable
+        rows = []
+        pivots = {}
+        for mask, n_mines in equations:
+            row = (dict.fromkeys(_bits(mask), 1), n_mines)
+            # The pivot equations contain no other pivot variable, so reducing by them adds no pivot variable
+            for variable in [variable for variable in row[0] if variable in pivots]:
+                row = _combine(row, rows[pivots[variable]], variable)
+            if not row[0]:
+                continue
+            pivot = min(row[0])
+            for i, other_row in enumerate(rows):
+                if pivot in other_row[0]:
+                    rows[i] = _combine(other_row, row, pivot)
+            pivots[pivot] = len(rows)
+            rows.append(row)
+
+        safe = mines = 0
+        for coefficients, right_side in rows:
+            positive = sum(1 << v for v, coefficient in coefficients.items() if coefficient > 0)
+            negative = sum(1 << v for v, coefficient in coefficients.items() if coefficient < 0)
+            if right_side == sum(coefficient for coefficient in coefficients.values() if coefficient > 0):
+                mines |= positive
+                safe |= negative
+            elif right_side == sum(coefficient for coefficient in coefficients.values() if coefficient < 0):
+                safe |= positive
+                mines |= negative
+        return safe, mines
+
+    def _search(self, constraints, n_variables, mines_range, should_cancel):
+        """ Search the mine configurations satisfying the constraints, given as (bitset of the cells, number of mines)
+            tuples, and stop as soon as every cell was seen both as a mine and as a safe cell.
+            Returns the bitsets of the cells that are safe and of the cells that are mines in all of them.
+        """
+        all_cells = (1 << n_variables) - 1
+        constraints_per_variable = [[] for _ in range(n_variables)]
+        for i, (mask, _) in enumerate(constraints):
+            for v in _bits(mask):
+                constraints_per_variable[v].append(i)
+        # Union of the mines and of the safe cells of the configurations found so far
+        seen_mines = seen_safe = 0
+        n_nodes = 0
+
+        def _propagate(mines, safe, pending):
+            """ Decide the cells of the pending constraints that have all their mines or all their safe cells.
+                Returns the new bitsets of the mines and of the safe cells, or None if a constraint can't be satisfied.
+            """
+            while pending:
+                mask, n_mines = constraints[pending.pop()]
+                n_found = _count(mask & mines)
+                unassigned = mask & ~(mines | safe)
+                n_unassigned = _count(unassigned)
+                if n_found > n_mines or n_found + n_unassigned < n_mines:
+                    return None
+                if not unassigned:
+                    continue
+                if n_found == n_mines:
+                    safe |= unassigned
+                elif n_found + n_unassigned == n_mines:
+                    mines |= unassigned
+                else:
+                    continue
+                for v in _bits(unassigned):
+                    pending.update(constraints_per_variable[v])
+            if mines_range is not None:
+                n_found = _count(mines)
+                if n_found > mines_range[1] or n_found + _count(all_cells & ~(mines | safe)) < mines_range[0]:
+                    return None
+            return mines, safe
+
+        def _backtrack(mines, safe, pending):
+            nonlocal seen_mines, seen_safe, n_nodes
+            n_nodes += 1
+            if n_nodes > self.max_nodes or (should_cancel is not None and not n_nodes % 256 and should_cancel()):
+                raise TimeoutError
+            assignment = _propagate(mines, safe, pending)
+            if assignment is None:
+                return
+            mines, safe = assignment
+            unassigned = all_cells & ~(mines | safe)
+            if not unassigned:
+                seen_mines |= mines
+                seen_safe |= safe
+                if seen_mines & seen_safe == all_cells:
+                    raise _NothingToDecide
+                return
+            # Try first the value the cell didn't have in a configuration yet, to rule it out sooner
+            cell = unassigned & -unassigned
+            cell_constraints = constraints_per_variable[cell.bit_length() - 1]
+            if seen_mines & cell:
+                _backtrack(mines, safe | cell, set(cell_constraints))
+                _backtrack(mines | cell, safe, set(cell_constraints))
+            else:
+                _backtrack(mines | cell, safe, set(cell_constraints))
+                _backtrack(mines, safe | cell, set(cell_constraints))
+
+        try:
+            _backtrack(0, 0, set(range(len(constraints))))
+        except (TimeoutError, _NothingToDecide):
+            return 0, 0
+        if not seen_mines and not seen_safe:
+            # No configuration satisfies the constraints
+            return 0, 0
+        return all_cells & ~seen_mines, all_cells & ~seen_safe
+
+
+def _bits(mask):
+    """ Returns the indices of the bits set in mask, from the lowest. """
+    indices = []
+    while mask:
+        bit = mask & -mask
+        indices.append(bit.bit_length() - 1)
+        mask ^= bit
+    return indices
+
+
+def _count(mask):
+    return bin(mask).count("1")
+
+
+def _combine(row, pivot_row, variable):
+    """ Returns row minus a multiple of pivot_row that cancels variable, with coprime integer coefficients. """
+    coefficients, right_side = row
+    pivot_coefficients, pivot_right_side = pivot_row
+    a, b = pivot_coefficients[variable], coefficients[variable]
+    combined = {v: a * coefficient for v, coefficient in coefficients.items()}
+    for v, coefficient in pivot_coefficients.items():
+        value = combined.get(v, 0) - b * coefficient
+        if value:
+            combined[v] = value
+        else:
+            combined.pop(v, None)
+    right_side = a * right_side - b * pivot_right_side
+    divisor = math.gcd(right_side, *combined.values())
+    if divisor > 1:
+        combined = {v: coefficient // divisor for v, coefficient in combined.items()}
+        right_side //= divisor
+    return combined, right_side
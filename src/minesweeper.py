@@ -0,0 +1,177 @@
+import itertools
+import random
+
+import agent
+from board import create_board, create_mines_board, find_cells_around, open_all, open_region, sample_indices
+from chunked import ChunkedMinesBoard
+from constants import (
+    DIRECTIONS, FLAG, LEFT, LOSE, MAX_CACHED_ADJACENT_CELLS, MINE, MINE_HIT, PLAYING, RIGHT, UNEXPLORED, WIN
+)
+
+
+class Minesweeper:
+    def __init__(self, size_x, size_y, n_mines, backend="list", seed=None):
+        self.size_x = size_x
+        self.size_y = size_y
+        self.n_mines = n_mines
+        self.backend = backend
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.random = random.Random(self.seed)
+        self.board = create_board(self.size_x, self.size_y, UNEXPLORED, self.backend)
+        self.mines_board = create_board(self.size_x, self.size_y, 0, self.backend)
+        self.started = False
+        self.updated_cells = []
+        self.n_revealed = 0
+        self.n_flags = 0
+        # Unexplored cells adjacent to a revealed clue
+        self.frontier = set()
+        self.status = PLAYING
+        self.first_click = None
+        # Log of the moves played, as (button, x, y) tuples
+        self.moves = []
+        # Offsets of the adjacent cells that are inside the grid, by whether the cell is on the first and last column
+        # and on the first and last row
+        self.adjacent_offsets = {
+            (first_x, last_x, first_y, last_y): [
+                (dx, dy) for dx, dy in DIRECTIONS
+                if not (first_x and dx < 0 or last_x and dx > 0 or first_y and dy < 0 or last_y and dy > 0)
+            ]
+            for first_x, last_x, first_y, last_y in itertools.product((False, True), repeat=4)
+        }
+        # Adjacent cells of the cells queried so far, see get_adjacent_cells
+        self.adjacent_cells = {}
+        self.agent = agent.Agent(self)
+
+    def get_adjacent_cells(self, x, y):
+        """ Returns the tuple of the cells adjacent to (x, y). The tuple is built once per cell and shared by the next
+            calls, from the offsets precomputed for the position of the cell relative to the borders of the grid.
+        """
+        adjacent_cells = self.adjacent_cells.get((x, y))
+        if adjacent_cells is None:
+            offsets = self.adjacent_offsets[x == 0, x == self.size_x - 1, y == 0, y == self.size_y - 1]
+            adjacent_cells = tuple([(x + dx, y + dy) for dx, dy in offsets])
+            if len(self.adjacent_cells) >= MAX_CACHED_ADJACENT_CELLS:
+                self.adjacent_cells.clear()
+            self.adjacent_cells[(x, y)] = adjacent_cells
+        return adjacent_cells
+
+    def generate_mines(self, x, y):
+        n_cells = self.size_x * self.size_y
+        safe_cells = [(x, y)]
+        if n_cells - self.n_mines >= 9:
+            safe_cells += self.get_adjacent_cells(x, y)
+        if self.backend == "chunked":
+            self.mines_board = ChunkedMinesBoard(self.size_x, self.size_y, self.n_mines, self.random.getrandbits(64),
+                                                 safe_cells)
+            return
+        safe_indices = sorted(sx * self.size_y + sy for sx, sy in safe_cells)
+        if self.n_mines > n_cells / 2:
+            # Dense board, sample the cells without a mine instead of the mines
+            no_mines = sample_indices(n_cells, n_cells - self.n_mines - len(safe_indices), safe_indices, self.random,
+                                      self.backend, keep_excluded=True)
+            self.mines_board = create_mines_board(self.size_x, self.size_y, no_mines, False, self.backend)
+        else:
+            mines = sample_indices(n_cells, self.n_mines, safe_indices, self.random, self.backend)
+            self.mines_board = create_mines_board(self.size_x, self.size_y, mines, True, self.backend)
+
+    def flag(self, x, y):
+        self.moves.append((RIGHT, x, y))
+        self.updated_cells.append((x, y))
+        if self.board[x][y] == UNEXPLORED:
+            self.board[x][y] = FLAG
+            self.n_flags += 1
+            self.frontier.discard((x, y))
+            for ax, ay in self.get_adjacent_cells(x, y):
+                self.agent.add_watched(ax, ay)
+        elif self.board[x][y] == FLAG:
+            self.board[x][y] = UNEXPLORED
+            self.n_flags -= 1
+            for ax, ay in self.get_adjacent_cells(x, y):
+                self.agent.add_watched(ax, ay)
+                if 1 <= self.board[ax][ay] <= 8:
+                    self.frontier.add((x, y))
+
+    def reveal(self, x, y):
+        self.board[x][y] = self.mines_board[x][y]
+        self.n_revealed += 1
+        self.frontier.discard((x, y))
+        self.agent.add_watched(x, y)
+        self.updated_cells.append((x, y))
+        is_clue = 1 <= self.board[x][y] <= 8
+        for ax, ay in self.get_adjacent_cells(x, y):
+            self.agent.add_watched(ax, ay)
+            if is_clue and self.board[ax][ay] == UNEXPLORED:
+                self.frontier.add((ax, ay))
+
+    def revealed(self, cells, clues, unexplored):
+        """ Update the counters, the frontier and the agent after cells were revealed at once on the board.
+            clues and unexplored are the cells around them, as returned by board.find_cells_around.
+        """
+        self.n_revealed += len(cells)
+        self.updated_cells.extend(cells)
+        self.frontier.difference_update(cells)
+        self.frontier.update(unexplored)
+        self.agent.add_watched_clues(clues)
+
+    def reveal_neighbors(self, x, y):
+        self.revealed(*open_region(self.board, self.mines_board, x, y, self.backend))
+
+    def left_click_at(self, x, y):
+        if self.status == PLAYING and self.board[x][y] == UNEXPLORED:
+            self.moves.append((LEFT, x, y))
+            if not self.started:
+                self.first_click = x, y
+                self.generate_mines(x, y)
+                if self.mines_board[x][y] == 0:
+                    self.reveal_neighbors(x, y)
+                else:
+                    self.reveal(x, y)
+                self.started = True
+            elif self.mines_board[x][y] == MINE:
+                self.revealed(*open_all(self.board, self.mines_board, self.backend))
+                self.status = LOSE
+                self.board[x][y] = MINE_HIT
+            else:
+                if self.mines_board[x][y] == 0:
+                    self.reveal_neighbors(x, y)
+                else:
+                    self.reveal(x, y)
+            if self.status == PLAYING and self.n_revealed == self.size_x * self.size_y - self.n_mines:
+                self.status = WIN
+
+    def left_click_cells(self, cells):
+        """ Open a batch of cells, stopping if the game ends. """
+        for x, y in cells:
+            if self.status != PLAYING:
+                break
+            self.left_click_at(x, y)
+
+    def right_click_at(self, x, y):
+        if self.status == PLAYING:
+            self.flag(x, y)
+
+    def apply_updates(self, updates):
+        """ Mirror the cells updated on another game of the same size, given as (x, y, value) tuples.
+            The mines of the mirror are unknown, so revealed cells take the value they have on the other game.
+        """
+        self.started = True
+        revealed_cells = []
+        for x, y, value in updates:
+            if value == FLAG and self.board[x][y] == UNEXPLORED:
+                self.flag(x, y)
+            elif value == UNEXPLORED and self.board[x][y] == FLAG:
+                self.flag(x, y)
+            elif value <= 8 and self.board[x][y] == UNEXPLORED:
+                self.mines_board[x][y] = value
+                self.board[x][y] = value
+                revealed_cells.append((x, y))
+        self.revealed(revealed_cells, *find_cells_around(self.board, revealed_cells, self.backend))
+
+    def solve(self, x, y):
+        """ Click at (x, y) and let the agent play until the game is over or the agent is stuck. """
+        self.left_click_at(x, y)
+        while self.status == PLAYING:
+            move = self.agent.get_cells_to_open()
+            if not move:
+                break
+            self.left_click_cells(move)
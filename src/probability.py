@@ -0,0 +1,193 @@
+import math
+import time
+
+from constants import FLAG, UNEXPLORED
+
+
+class ProbabilitySolver:
+    """ Computes the probability of each unexplored cell to be a mine.
+        The valid mine configurations of each frontier component are enumerated by backtracking, and the components are
+        weighted together by the number of ways to place the remaining mines on the unexplored cells outside of the
+        frontier. Components that are too large or too slow to enumerate are approximated from their clues.
+    """
+
+    def __init__(self, board, get_adjacent_cells, max_component_size=48, max_nodes=200000, max_time=1.0):
+        self.board = board
+        self.get_adjacent_cells = get_adjacent_cells
+        self.max_component_size = max_component_size
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        # Enumeration results of the components by frozenset of cells, None if the component had to be approximated
+        self._enumerations = {}
+
+    def get_probabilities(self, components, n_mines_left, n_unexplored):
+        """ components is a list of (clues, cells) tuples partitioning the frontier.
+            Returns a dictionary of the mine probability of each frontier cell, and the mine probability of the
+            unexplored cells outside of the frontier, None if there are none.
+        """
+        deadline = time.perf_counter() + self.max_time
+        self._enumerations = {
+            cells: self._enumerations[cells] for _, cells in components if cells in self._enumerations
+        }
+
+        exact = []
+        probabilities = {}
+        n_approximated_mines = 0
+        n_outside = n_unexplored
+        for clues, cells in components:
+            n_outside -= len(cells)
+            if cells in self._enumerations:
+                enumeration = self._enumerations[cells]
+            else:
+                enumeration = self._enumerate(clues, cells, deadline)
+                # Components that ran out of time may be enumerated next time
+                if enumeration is not None or time.perf_counter() <= deadline:
+                    self._enumerations[cells] = enumeration
+            if enumeration is None:
+                approximation = self._approximate(clues)
+                probabilities.update(approximation)
+                n_approximated_mines += sum(approximation.values())
+            else:
+                exact.append(enumeration)
+
+        n_mines_left -= round(n_approximated_mines)
+        n_free = n_outside + sum(len(cell_counts) for _, cell_counts in exact)
+        n_mines_left = min(max(n_mines_left, 0), n_free)
+
+        # Number of frontier configurations with K mines, for every K
+        total_counts = [1]
+        for counts, _ in exact:
+            total_counts = _convolve(total_counts, counts)
+
+        # Number of ways to place the other mines outside of the frontier, for every K
+        weights = [
+            math.comb(n_outside, n_mines_left - k) if 0 <= n_mines_left - k <= n_outside else 0
+            for k in range(len(total_counts))
+        ]
+        total_weight = sum(count * weight for count, weight in zip(total_counts, weights))
+        if not total_weight:
+            # The approximations are not consistent with the exact components, fall back to the clues alone
+            for clues, _ in components:
+                probabilities.update(self._approximate(clues))
+            return probabilities, n_mines_left / n_outside if n_outside else None
+
+        for counts, cell_counts in exact:
+            # Weight of the configurations of this component with k mines, combined with all the other components
+            other_counts = _deconvolve(total_counts, counts)
+            component_weights = [
+                sum(other_counts[j] * weights[j + k] for j in range(len(other_counts)))
+                for k in range(len(counts))
+            ]
+            for cell, counts_per_k in cell_counts.items():
+                probabilities[cell] = sum(c * w for c, w in zip(counts_per_k, component_weights)) / total_weight
+
+        if not n_outside:
+            return probabilities, None
+        expected_outside = sum(
+            count * weight * (n_mines_left - k) for k, (count, weight) in enumerate(zip(total_counts, weights))
+        )
+        return probabilities, expected_outside / total_weight / n_outside
+
+    def _get_constraints(self, clues):
+        """ Returns the list of frontier cells around the clues and, for each clue, the number of mines missing and the
+            indices of its unexplored cells in that list.
+        """
+        cells = []
+        indices = {}
+        constraints = []
+        for cx, cy in clues:
+            n_missing = int(self.board[cx][cy])
+            adjacent_indices = []
+            for ax, ay in self.get_adjacent_cells(cx, cy):
+                if self.board[ax][ay] == FLAG:
+                    n_missing -= 1
+                elif self.board[ax][ay] == UNEXPLORED:
+                    if (ax, ay) not in indices:
+                        indices[(ax, ay)] = len(cells)
+                        cells.append((ax, ay))
+                    adjacent_indices.append(indices[(ax, ay)])
+            constraints.append((n_missing, adjacent_indices))
+        return cells, constraints
+
+    def _enumerate(self, clues, cells, deadline):
+        """ Count the valid configurations of a component by backtracking.
+            Returns the number of configurations with k mines and, for each cell, the number of configurations with k
+            mines where the cell is a mine, for every k. Returns None if the component exceeds the budget.
+        """
+        if len(cells) > self.max_component_size:
+            return None
+        variables, constraints = self._get_constraints(clues)
+        constraints_per_variable = [[] for _ in variables]
+        for i, (_, adjacent_indices) in enumerate(constraints):
+            for v in adjacent_indices:
+                constraints_per_variable[v].append(i)
+        n_missing = [n for n, _ in constraints]
+        n_unassigned = [len(adjacent_indices) for _, adjacent_indices in constraints]
+        assignment = [0] * len(variables)
+        counts = [0] * (len(variables) + 1)
+        cell_counts = [[0] * (len(variables) + 1) for _ in variables]
+        n_nodes = 0
+
+        def _backtrack(v, n_mines):
+            nonlocal n_nodes
+            n_nodes += 1
+            if n_nodes > self.max_nodes or (not n_nodes % 1024 and time.perf_counter() > deadline):
+                raise TimeoutError
+            if v == len(variables):
+                counts[n_mines] += 1
+                for i, is_mine in enumerate(assignment):
+                    if is_mine:
+                        cell_counts[i][n_mines] += 1
+                return
+            for is_mine in (0, 1):
+                valid = True
+                for c in constraints_per_variable[v]:
+                    n_unassigned[c] -= 1
+                    n_missing[c] -= is_mine
+                    if n_missing[c] < 0 or n_missing[c] > n_unassigned[c]:
+                        valid = False
+                if valid:
+                    assignment[v] = is_mine
+                    _backtrack(v + 1, n_mines + is_mine)
+                    assignment[v] = 0
+                for c in constraints_per_variable[v]:
+                    n_unassigned[c] += 1
+                    n_missing[c] += is_mine
+
+        try:
+            _backtrack(0, 0)
+        except TimeoutError:
+            return None
+        return counts, dict(zip(variables, cell_counts))
+
+    def _approximate(self, clues):
+        """ Estimate the mine probability of the cells of a component from the density of mines around each clue. """
+        probabilities = {}
+        variables, constraints = self._get_constraints(clues)
+        for n_missing, adjacent_indices in constraints:
+            density = n_missing / len(adjacent_indices) if adjacent_indices else 0
+            for v in adjacent_indices:
+                probabilities[variables[v]] = max(probabilities.get(variables[v], 0), density)
+        return probabilities
+
+
+def _convolve(a, b):
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                result[i + j] += x * y
+    return result
+
+
+def _deconvolve(a, b):
+    """ Returns q such that a is the convolution of q and b, b must divide a exactly. """
+    shift = next(i for i, x in enumerate(b) if x)
+    q = [0] * (len(a) - len(b) + 1)
+    remainder = list(a)
+    for i in range(len(q)):
+        q[i] = remainder[i + shift] // b[shift]
+        if q[i]:
+            for j in range(shift, len(b)):
+                remainder[i + j] -= q[i] * b[j]
+    return q
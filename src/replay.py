@@ -0,0 +1,125 @@
+import argparse
+import json
+import struct
+import sys
+import time
+import zlib
+
+from agent import STRATEGIES
+from board import BACKENDS
+from constants import LEFT, LOSE, PLAYING, RIGHT, WIN
+from minesweeper import Minesweeper
+from stats import write_collapsed_stacks
+
+MAGIC = b"MSRP"
+VERSION = 1
+# magic, version, backend, size_x, size_y, n_mines, seed, first click x and y (-1 if not started), number of moves
+HEADER = struct.Struct("<4sBBIIIQiiI")
+# button, x, y
+MOVE = struct.Struct("<BII")
+
+STATUS_NAMES = {PLAYING: "stuck", WIN: "won", LOSE: "lost"}
+
+
+def save_replay(minesweeper, path):
+    first_x, first_y = minesweeper.first_click if minesweeper.first_click is not None else (-1, -1)
+    header = HEADER.pack(
+        MAGIC, VERSION, BACKENDS.index(minesweeper.backend), minesweeper.size_x, minesweeper.size_y,
+        minesweeper.n_mines, minesweeper.seed, first_x, first_y, len(minesweeper.moves)
+    )
+    moves = b"".join(MOVE.pack(*move) for move in minesweeper.moves)
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(zlib.compress(moves))
+
+
+def load_replay(path):
+    """ Load a replay file.
+        Returns a new game with the recorded size, mines and seed, and the list of moves to play on it.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, backend, size_x, size_y, n_mines, seed, _, _, n_moves = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} replay file.")
+    moves = list(MOVE.iter_unpack(zlib.decompress(data[HEADER.size:])))
+    if len(moves) != n_moves:
+        raise ValueError(f"{path} is truncated, expected {n_moves} moves but found {len(moves)}.")
+    return Minesweeper(size_x, size_y, n_mines, BACKENDS[backend], seed), moves
+
+
+def play_replay(minesweeper, moves):
+    for button, x, y in moves:
+        if button == LEFT:
+            minesweeper.left_click_at(x, y)
+        elif button == RIGHT:
+            minesweeper.flag(x, y)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded game without a window.")
+    parser.add_argument("path", help="replay file to play")
+    parser.add_argument(
+        "--solve", action="store_true",
+        help="let the current agent play from the recorded first click and report where it diverges from the replay"
+    )
+    parser.add_argument("--guess", action="store_true", help="let the agent guess, as with main.py --guess")
+    parser.add_argument(
+        "--batch", action="store_true", help="let the agent play in batch mode, as in the interactive game"
+    )
+    parser.add_argument(
+        "--strategy", choices=STRATEGIES, default="rules",
+        help="rules the agent deduces with, as with main.py --strategy"
+    )
+    parser.add_argument(
+        "--stats", metavar="PATH", help="with --solve, write the stats of each rule of the agent as JSON"
+    )
+    parser.add_argument(
+        "--trace", metavar="PATH", help="with --solve, write the time spent in each rule as collapsed stacks"
+    )
+    parser.add_argument("--profile", metavar="PATH", help="with --solve, write the cProfile stats of the agent")
+    args = parser.parse_args()
+
+    minesweeper, moves = load_replay(args.path)
+    minesweeper.agent.guess = args.guess
+    minesweeper.agent.batch = args.batch
+    minesweeper.agent.set_strategy(args.strategy)
+    stats = None
+    if args.stats or args.trace or args.profile:
+        stats = minesweeper.agent.enable_stats(profile=args.profile is not None)
+    print(f"{minesweeper.size_x}x{minesweeper.size_y} grid with {minesweeper.n_mines} mines, seed {minesweeper.seed}")
+    start = time.perf_counter()
+    if args.solve:
+        if not moves:
+            print("The replay has no moves.")
+            sys.exit(-1)
+        _, x, y = moves[0]
+        minesweeper.solve(x, y)
+    else:
+        play_replay(minesweeper, moves)
+    elapsed = time.perf_counter() - start
+    print(f"Played {len(minesweeper.moves)} moves in {elapsed:.3f}s, the game is {STATUS_NAMES[minesweeper.status]}")
+
+    if args.solve:
+        for i, (move, recorded_move) in enumerate(zip(minesweeper.moves, moves)):
+            if move != recorded_move:
+                print(f"The agent diverges from the replay at move {i}: {move} instead of {recorded_move}")
+                break
+        else:
+            if len(minesweeper.moves) != len(moves):
+                print(f"The agent diverges from the replay at move {min(len(minesweeper.moves), len(moves))}")
+            else:
+                print("The agent plays the same moves as the replay")
+
+    if stats is not None:
+        if args.stats:
+            with open(args.stats, "w") as file:
+                json.dump(stats.as_dict(per_call=True), file, indent=4)
+        if args.trace:
+            write_collapsed_stacks(stats.as_dict(), args.trace)
+        if args.profile:
+            stats.dump_profile(args.profile)
+
+
+if __name__ == '__main__':
+    main()
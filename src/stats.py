@@ -0,0 +1,126 @@
+import cProfile
+import time
+
+
+class SolverStats:
+    """ Records, for each call to the agent, the time spent in each of its rules and the cells they found, and the
+        number of nodes and the depth reached by the search by contradiction.
+        The agent methods are wrapped by Agent.enable_stats, an agent without stats runs the methods directly.
+    """
+
+    def __init__(self, minesweeper, profile=False):
+        self.minesweeper = minesweeper
+        # One dictionary per call to get_cells_to_open
+        self.calls = []
+        self.profiler = cProfile.Profile() if profile else None
+        self._call = None
+
+    def wrap_call(self, get_cells_to_open):
+        def _get_cells_to_open():
+            self._call = {
+                "time": 0, "rule": None, "cells": 0, "rules": {}, "guesses": 0, "search_nodes": 0, "search_depth": 0
+            }
+            if self.profiler is not None:
+                self.profiler.enable()
+            start = time.perf_counter()
+            try:
+                cells_to_open = get_cells_to_open()
+            finally:
+                self._call["time"] = time.perf_counter() - start
+                if self.profiler is not None:
+                    self.profiler.disable()
+                self.calls.append(self._call)
+                self._call = None
+            self.calls[-1]["cells"] = len(cells_to_open)
+            return cells_to_open
+
+        return _get_cells_to_open
+
+    def wrap_rule(self, name, rule):
+        def _rule():
+            n_flags = self.minesweeper.n_flags
+            start = time.perf_counter()
+            cells_to_open = rule()
+            self._call["rules"][name] = {
+                "time": time.perf_counter() - start,
+                "cells": len(cells_to_open),
+                "flags": self.minesweeper.n_flags - n_flags,
+            }
+            if cells_to_open:
+                self._call["rule"] = name
+            return cells_to_open
+
+        return _rule
+
+    def wrap_search(self, search):
+        def _search(cells, n_mines_left, n_unexplored, x, y, depth=0):
+            if self._call is not None:
+                self._call["search_nodes"] += 1
+                self._call["search_depth"] = max(self._call["search_depth"], depth)
+                if not depth:
+                    self._call["guesses"] += 1
+            return search(cells, n_mines_left, n_unexplored, x, y, depth)
+
+        return _search
+
+    def as_dict(self, per_call=False):
+        """ Returns the totals of the calls as a dictionary that can be serialized as JSON, with the list of the calls
+            if per_call is True.
+        """
+        stats = summarize(self.calls)
+        if per_call:
+            stats["per_call"] = self.calls
+        return stats
+
+    def dump_profile(self, path):
+        """ Write the cProfile stats of the calls, which can be read with pstats or converted to a flame graph. """
+        self.profiler.dump_stats(path)
+
+
+def summarize(calls):
+    """ Returns the totals per rule of a list of calls recorded by SolverStats. """
+    rules = {}
+    for call in calls:
+        for name, rule_stats in call["rules"].items():
+            totals = rules.setdefault(name, {"calls": 0, "hits": 0, "time": 0, "cells": 0, "flags": 0})
+            totals["calls"] += 1
+            totals["hits"] += call["rule"] == name
+            for key in ("time", "cells", "flags"):
+                totals[key] += rule_stats[key]
+    return {
+        "calls": len(calls),
+        "time": sum(call["time"] for call in calls),
+        "rules": rules,
+        "search": {
+            "guesses": sum(call["guesses"] for call in calls),
+            "nodes": sum(call["search_nodes"] for call in calls),
+            "max_depth": max((call["search_depth"] for call in calls), default=0),
+        },
+    }
+
+
+def merge(summaries):
+    """ Add up the totals returned by summarize, for example for games played in different processes. """
+    merged = {"calls": 0, "time": 0, "rules": {}, "search": {"guesses": 0, "nodes": 0, "max_depth": 0}}
+    for summary in summaries:
+        merged["calls"] += summary["calls"]
+        merged["time"] += summary["time"]
+        for name, rule_stats in summary["rules"].items():
+            totals = merged["rules"].setdefault(name, dict.fromkeys(rule_stats, 0))
+            for key, value in rule_stats.items():
+                totals[key] += value
+        merged["search"]["guesses"] += summary["search"]["guesses"]
+        merged["search"]["nodes"] += summary["search"]["nodes"]
+        merged["search"]["max_depth"] = max(merged["search"]["max_depth"], summary["search"]["max_depth"])
+    return merged
+
+
+def write_collapsed_stacks(summary, path):
+    """ Write the time spent in each rule in microseconds in the collapsed stack format read by flamegraph.pl and
+        speedscope, with the time spent outside of the rules on the get_cells_to_open frame.
+    """
+    rules_time = sum(rule_stats["time"] for rule_stats in summary["rules"].values())
+    with open(path, "w") as file:
+        file.write(f"get_cells_to_open {round(1e6 * (summary['time'] - rules_time))}\n")
+        for name, rule_stats in summary["rules"].items():
+            file.write(f"get_cells_to_open;{name} {round(1e6 * rule_stats['time'])}\n")
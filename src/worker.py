@@ -0,0 +1,109 @@
+import multiprocessing
+import queue
+
+from agent import SolverCancelled
+from constants import LEFT, PLAYING, RIGHT, UNEXPLORED
+from minesweeper import Minesweeper
+
+
+class SolverWorker:
+    """ Runs the agent in a separate process so that it doesn't block the game loop.
+        The worker mirrors the game from the cells updated on it, and sends back batches of moves through a bounded
+        queue. Moves computed before the last call to cancel are dropped.
+    """
+
+    def __init__(self, minesweeper, max_batches=4):
+        self.minesweeper = minesweeper
+        self.enabled = False
+        self.generation = multiprocessing.Value("i", 0)
+        self.updates = multiprocessing.Queue()
+        self.moves = multiprocessing.Queue(max_batches)
+        config = (
+            minesweeper.size_x, minesweeper.size_y, minesweeper.n_mines, minesweeper.backend, minesweeper.seed,
+            minesweeper.agent.guess, minesweeper.agent.strategy
+        )
+        self.process = multiprocessing.Process(
+            target=_run, args=(config, self.updates, self.moves, self.generation), daemon=True
+        )
+        self.process.start()
+        self._changed = False
+
+    def cancel(self):
+        """ Drop the moves being computed and the ones waiting to be applied. """
+        with self.generation.get_lock():
+            self.generation.value += 1
+        self._changed = True
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.cancel()
+
+    def send_updates(self, updated_cells):
+        """ Send the cells updated on the game since the last call to the worker. """
+        if updated_cells or self._changed:
+            board = self.minesweeper.board
+            updates = [(x, y, int(board[x][y])) for x, y in dict.fromkeys(updated_cells)]
+            self.updates.put((self.generation.value, self.enabled, updates))
+            self._changed = False
+
+    def apply_moves(self):
+        """ Apply the batches of moves that the worker computed for the current state of the game, without waiting. """
+        while self.minesweeper.status == PLAYING:
+            try:
+                generation, batch = self.moves.get_nowait()
+            except queue.Empty:
+                return
+            if generation != self.generation.value:
+                continue
+            for button, x, y in batch:
+                if button == LEFT:
+                    self.minesweeper.left_click_at(x, y)
+                elif button == RIGHT and self.minesweeper.board[x][y] == UNEXPLORED:
+                    self.minesweeper.right_click_at(x, y)
+
+    def stop(self):
+        self.cancel()
+        self.updates.put(None)
+        self.process.join(1)
+
+
+def _run(config, updates, moves, generation):
+    size_x, size_y, n_mines, backend, seed, guess, strategy = config
+    mirror = Minesweeper(size_x, size_y, n_mines, backend, seed)
+    mirror.started = True
+    agent = mirror.agent
+    agent.set_strategy(strategy)
+    agent.guess = guess
+    agent.batch = True
+    current_generation = 0
+    agent.should_cancel = lambda: generation.value != current_generation
+    enabled = False
+    while True:
+        # The agent can't go further until the moves it sent are applied, so wait for the game to send updates
+        message = updates.get()
+        try:
+            while True:
+                if message is None:
+                    return
+                current_generation, enabled, cell_updates = message
+                mirror.apply_updates(cell_updates)
+                message = updates.get_nowait()
+        except queue.Empty:
+            pass
+        if not enabled or mirror.status != PLAYING:
+            continue
+
+        n_moves = len(mirror.moves)
+        try:
+            cells_to_open = agent.get_cells_to_open()
+        except SolverCancelled:
+            continue
+        # The flags placed by the agent are in the move log of the mirror
+        batch = [(button, x, y) for button, x, y in mirror.moves[n_moves:] if button == RIGHT]
+        batch += [(LEFT, x, y) for x, y in cells_to_open]
+        while batch and generation.value == current_generation:
+            try:
+                moves.put((current_generation, batch), timeout=0.1)
+                break
+            except queue.Full:
+                pass